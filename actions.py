@@ -304,7 +304,7 @@ class MovementAction(ActionWithDirection):
                     if portal["lifetime"] <= 0:
                         portals_to_remove.append(portal)
                         x, y = portal["location"]
-                        self.engine.game_map.tiles[x, y] = tile_types.floor
+                        self.engine.game_map.set_tile(x, y, tile_types.floor)
                         self.engine.message_log.add_message(
                             "A red portal fades away...", color.red
                         )
@@ -322,8 +322,8 @@ class MovementAction(ActionWithDirection):
                 
                 # Check if the location is valid
                 if (self.engine.game_map.in_bounds(portal_x, portal_y) and 
-                    self.engine.game_map.tiles["walkable"][portal_x, portal_y]):
-                    self.engine.game_map.tiles[portal_x, portal_y] = tile_types.portal_red
+                    self.engine.game_map.walkable[portal_x, portal_y]):
+                    self.engine.game_map.set_tile(portal_x, portal_y, tile_types.portal_red)
                     self.engine.portal_locations.append({
                         "location": (portal_x, portal_y),
                         "lifetime": 10  # Portal will exist for 10 moves
@@ -339,25 +339,10 @@ class MovementAction(ActionWithDirection):
             if self.entity is self.engine.player:
                 if self.engine.game_map.tiles[dest_x, dest_y] == tile_types.portal_blue:
                     self.engine.game_world.current_floor = 1  # Set to first dungeon floor
+                    # generate_floor places the player on the new floor's start
+                    # cell and the party next to them
                     self.engine.game_world.generate_floor()
                     
-                    # Get all party members before changing map
-                    party_members = [
-                        entity for entity in self.engine.game_map.actors
-                        if hasattr(entity, "ai") and hasattr(entity.ai, "in_party") and entity.ai.in_party
-                    ]
-                    
-                    # Place player and party in dungeon
-                    center_x = self.engine.game_map.width // 2
-                    center_y = self.engine.game_map.height // 2
-                    self.entity.place(center_x, center_y, self.engine.game_map)
-                    
-                    # Place party members around the player
-                    for i, member in enumerate(party_members):
-                        dx = [-1, 1, 0, 0][i % 4]
-                        dy = [0, 0, -1, 1][i % 4]
-                        member.place(center_x + dx, center_y + dy, self.engine.game_map)
-                    
                     self.engine.message_log.add_message(
                         "You step through the blue portal and enter the dungeon!", color.blue
                     )
@@ -369,28 +354,11 @@ class MovementAction(ActionWithDirection):
                         self.engine.game_world.current_floor = 0  # Return to city
                         self.engine.game_world.generate_floor()
                         
-                        # Get party members
-                        party_members = [
-                            entity for entity in self.engine.game_map.actors
-                            if hasattr(entity, "ai") and hasattr(entity.ai, "in_party") and entity.ai.in_party
-                        ]
-                        
-                        # Place player and party in city
-                        center_x = self.engine.game_map.width // 2
-                        center_y = self.engine.game_map.height // 2
-                        self.entity.place(center_x, center_y, self.engine.game_map)
-                        
-                        # Place party members
-                        for i, member in enumerate(party_members):
-                            dx = [-1, 1, 0, 0][i % 4]
-                            dy = [0, 0, -1, 1][i % 4]
-                            member.place(center_x, center_y, self.engine.game_map)
-                        
                         self.engine.message_log.add_message(
                             "You step through the red portal and return to the city!", color.red
                         )
                         return
-            if not self.engine.game_map.tiles["walkable"][dest_x, dest_y]:
+            if not self.engine.game_map.walkable[dest_x, dest_y]:
                 # Destination is blocked by a tile.
                 raise exceptions.Impossible("That way is blocked.")
             if self.engine.game_map.get_blocking_entity_at_location(dest_x, dest_y):
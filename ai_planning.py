@@ -0,0 +1,357 @@
+"""
+AI planning against a read-only snapshot of the map.
+
+The planners in this module are plain functions of a MapSnapshot and a planning
+request, they never touch live entities. That lets them run in worker processes;
+the decisions they return are turned into actions by the AI components in the
+main process.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import math
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+import tcod
+
+from pathfinding import same_region
+
+if TYPE_CHECKING:
+    from entity import Actor
+    from game_map import GameMap
+    from pathfinding import RegionGraph
+
+
+# Below this many planning requests a turn the pool overhead outweighs the gain.
+POOL_MIN_REQUESTS = 64
+
+# Group followers only leave formation and plan their own path to a target this close.
+FORMATION_CHASE_RADIUS = 2
+
+WAIT = ("wait",)
+
+# (planner name, actor index, planner arguments)
+PlanningRequest = Tuple[str, int, tuple]
+Decision = tuple
+
+
+class MapSnapshot:
+    """Everything the planners need from a GameMap, copied at the start of a turn.
+
+    With copy_arrays=False the map arrays are shared instead of copied, for a
+    snapshot which is used right away by a single AI.
+    """
+
+    def __init__(self, gamemap: GameMap, copy_arrays: bool = True):
+        engine = gamemap.engine
+        if copy_arrays:
+            # Sorted so a turn plans in the same order regardless of set ordering.
+            self.actors: List[Actor] = sorted(
+                gamemap.actors, key=lambda actor: (actor.x, actor.y)
+            )
+        else:
+            self.actors = list(gamemap.actors)
+        self.index: Dict[Actor, int] = {
+            actor: i for i, actor in enumerate(self.actors)
+        }
+        self.actor_x = np.array([actor.x for actor in self.actors], dtype=np.intp)
+        self.actor_y = np.array([actor.y for actor in self.actors], dtype=np.intp)
+        self.actor_faction = np.array(
+            [actor.faction for actor in self.actors], dtype=np.intp
+        )
+        self.player_index = self.index.get(engine.player, -1)
+
+        self.walkable = gamemap.walkable
+        self.visible = gamemap.visible
+        self.known = gamemap.known
+        self.region_labels = gamemap.region_labels
+        if copy_arrays:
+            self.walkable = self.walkable.copy()
+            self.region_labels = self.region_labels.copy()
+            self.visible = self.visible.copy()
+            self.known = self.known.copy()
+        self.regions = gamemap.get_region_graph()
+        self._gamemap: Optional[GameMap] = gamemap
+        self._cost: Optional[np.ndarray] = None
+
+    @property
+    def cost(self) -> np.ndarray:
+        """The pathfinding cost array, only built once somebody needs it."""
+        if self._cost is None:
+            self._cost = self._gamemap.get_path_cost()
+        return self._cost
+
+    def __getstate__(self) -> dict:
+        # Workers get the arrays only, never the live entities.
+        self.cost
+        state = self.__dict__.copy()
+        state["actors"] = []
+        state["index"] = {}
+        state["_gamemap"] = None
+        return state
+
+
+def find_path(
+    cost: np.ndarray,
+    start: Tuple[int, int],
+    dest: Tuple[int, int],
+    regions: Optional[RegionGraph] = None,
+    region_labels: Optional[np.ndarray] = None,
+) -> List[Tuple[int, int]]:
+    """Compute and return a path from start to dest, or an empty list.
+
+    With region_labels a dest in another connected area is rejected without
+    searching. Long paths are planned on the region graph first when one is given.
+    """
+    if region_labels is not None and not same_region(region_labels, start, dest):
+        return []
+    if regions is not None and max(
+        abs(dest[0] - start[0]), abs(dest[1] - start[1])
+    ) > regions.long_path_distance:
+        path = regions.find_path(cost, start, dest)
+        if path:
+            return path
+
+    # Create a graph from the cost array and pass that graph to a new pathfinder.
+    graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+    pathfinder = tcod.path.Pathfinder(graph)
+
+    pathfinder.add_root(start)  # Start position.
+
+    # Compute the path to the destination and remove the starting point.
+    path: List[List[int]] = pathfinder.path_to(dest)[1:].tolist()
+
+    # Convert from List[List[int]] to List[Tuple[int, int]].
+    return [(index[0], index[1]) for index in path]
+
+
+def reachable_actors(snapshot: MapSnapshot, index: int) -> np.ndarray:
+    """Return a mask of the actors in the same connected area as actor index."""
+    labels = snapshot.region_labels[snapshot.actor_x, snapshot.actor_y]
+    return labels == labels[index]
+
+
+def is_free(snapshot: MapSnapshot, x: int, y: int) -> bool:
+    """True if (x, y) is on the map, walkable and not taken by a blocking entity."""
+    width, height = snapshot.walkable.shape
+    if not (0 <= x < width and 0 <= y < height):
+        return False
+    # Blocking entities add 10 to the cost of their tile.
+    return bool(snapshot.walkable[x, y]) and snapshot.cost[x, y] < 10
+
+
+def formation_path(
+    snapshot: MapSnapshot,
+    index: int,
+    slot: Tuple[int, int],
+    leader: Tuple[int, int],
+    path: List[Tuple[int, int]],
+) -> List[Tuple[int, int]]:
+    """Return the next steps of a group follower towards its formation slot.
+
+    A single greedy step is used while the way is clear, a real path is only
+    computed when the follower is blocked.
+    """
+    x, y = int(snapshot.actor_x[index]), int(snapshot.actor_y[index])
+    slot_x, slot_y = slot
+    width, height = snapshot.walkable.shape
+    if not (0 <= slot_x < width and 0 <= slot_y < height) or not snapshot.walkable[slot_x, slot_y]:
+        # The slot is inside a wall, so just stay close to the leader.
+        slot_x, slot_y = leader
+
+    current = max(abs(slot_x - x), abs(slot_y - y))
+    if current == 0:
+        return []
+
+    best_step = None
+    best_distance = current
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            distance = max(abs(slot_x - x - dx), abs(slot_y - y - dy))
+            if distance < best_distance and is_free(snapshot, x + dx, y + dy):
+                best_step = (x + dx, y + dy)
+                best_distance = distance
+
+    if best_step:
+        return [best_step]
+    if current == 1:
+        # The slot is taken by someone else, wait next to it.
+        return []
+    if path and path[-1] == (slot_x, slot_y):
+        # Keep following the path planned when we were last blocked.
+        return path
+    return find_path(snapshot.cost, (x, y), (slot_x, slot_y), snapshot.regions, snapshot.region_labels)
+
+
+def plan_hostile(
+    snapshot: MapSnapshot,
+    index: int,
+    relations: np.ndarray,
+    formation: Optional[Tuple[Tuple[int, int], Tuple[int, int]]],
+    path: List[Tuple[int, int]],
+) -> Decision:
+    """Chase and attack the target with the lowest distance / aggression.
+
+    relations is the row of Engine.relations for this monster's faction. Group
+    followers keep formation behind the leader, which plans the only path of
+    the group, until they are within FORMATION_CHASE_RADIUS of the target.
+    """
+    x, y = int(snapshot.actor_x[index]), int(snapshot.actor_y[index])
+
+    aggression_by_actor = relations[snapshot.actor_faction]
+    # Цели в другой области карты недостижимы, их не выбираем
+    candidates = (aggression_by_actor > 0) & reachable_actors(snapshot, index)
+    candidates[index] = False
+    if not candidates.any():
+        return WAIT
+    # Учитываем агрессию при расчете эффективного расстояния
+    effective_distance = np.full(len(candidates), np.inf)
+    effective_distance[candidates] = (
+        np.hypot(snapshot.actor_x[candidates] - x, snapshot.actor_y[candidates] - y)
+        / aggression_by_actor[candidates]
+    )
+    target = int(np.argmin(effective_distance))
+    target_x, target_y = int(snapshot.actor_x[target]), int(snapshot.actor_y[target])
+
+    dx = target_x - x
+    dy = target_y - y
+    if snapshot.visible[x, y]:
+        if max(abs(dx), abs(dy)) <= 1:
+            return ("attack", dx, dy)
+        if formation and max(abs(dx), abs(dy)) > FORMATION_CHASE_RADIUS:
+            path = formation_path(snapshot, index, formation[0], formation[1], path)
+        else:
+            path = find_path(snapshot.cost, (x, y), (target_x, target_y), snapshot.regions, snapshot.region_labels)
+    if path:
+        return ("move", path)
+    return WAIT
+
+
+def plan_ranged(
+    snapshot: MapSnapshot,
+    index: int,
+    min_range: int,
+    max_range: int,
+    formation: Optional[Tuple[Tuple[int, int], Tuple[int, int]]],
+    path: List[Tuple[int, int]],
+) -> Decision:
+    """Keep the player between min_range and max_range and shoot."""
+    if snapshot.player_index < 0:
+        return WAIT
+    x, y = int(snapshot.actor_x[index]), int(snapshot.actor_y[index])
+    target_x = int(snapshot.actor_x[snapshot.player_index])
+    target_y = int(snapshot.actor_y[snapshot.player_index])
+    dx = target_x - x
+    dy = target_y - y
+    distance = max(abs(dx), abs(dy))  # Chebyshev distance
+
+    if not snapshot.known[x, y]:
+        return WAIT
+    if distance < min_range:
+        # Пытаемся отойти от цели
+        if is_free(snapshot, x - dx, y - dy):
+            return ("retreat", -dx, -dy)
+        return WAIT
+    if distance <= max_range:
+        return ("attack", dx, dy)
+
+    if formation:
+        path = formation_path(snapshot, index, formation[0], formation[1], path)
+    else:
+        path = find_path(snapshot.cost, (x, y), (target_x, target_y), snapshot.regions, snapshot.region_labels)
+    if path:
+        return ("move", path)
+    return WAIT
+
+
+def plan_friendly(
+    snapshot: MapSnapshot,
+    index: int,
+    relations: np.ndarray,
+    in_party: bool,
+    path: List[Tuple[int, int]],
+) -> Decision:
+    """Fight hostiles close to a party member, otherwise follow the player."""
+    if not in_party:
+        return WAIT
+    x, y = int(snapshot.actor_x[index]), int(snapshot.actor_y[index])
+
+    hostile = (relations[snapshot.actor_faction] > 0) & reachable_actors(snapshot, index)
+    hostile[index] = False
+    hostiles = np.flatnonzero(hostile)
+    if hostiles.size:
+        distances = np.hypot(snapshot.actor_x[hostiles] - x, snapshot.actor_y[hostiles] - y)
+        closest = int(np.argmin(distances))
+        enemy = int(hostiles[closest])
+        if distances[closest] <= 8:  # Радиус обнаружения
+            dx = int(snapshot.actor_x[enemy]) - x
+            dy = int(snapshot.actor_y[enemy]) - y
+            if distances[closest] <= 1:
+                return ("attack", dx, dy, enemy)
+            path = find_path(snapshot.cost, (x, y), (x + dx, y + dy), snapshot.regions, snapshot.region_labels)
+            if path:
+                return ("chase", path, enemy)
+
+    if snapshot.player_index < 0:
+        return WAIT
+    target_x = int(snapshot.actor_x[snapshot.player_index])
+    target_y = int(snapshot.actor_y[snapshot.player_index])
+    if max(abs(target_x - x), abs(target_y - y)) > 2:  # Держим дистанцию
+        path = find_path(snapshot.cost, (x, y), (target_x, target_y), snapshot.regions, snapshot.region_labels)
+        if path:
+            return ("follow", path)
+    return WAIT
+
+
+PLANNERS = {
+    "hostile": plan_hostile,
+    "ranged": plan_ranged,
+    "friendly": plan_friendly,
+}
+
+
+def run_request(snapshot: MapSnapshot, request: PlanningRequest) -> Decision:
+    name, index, args = request
+    return PLANNERS[name](snapshot, index, *args)
+
+
+def run_requests(
+    snapshot: MapSnapshot, requests: Sequence[PlanningRequest]
+) -> List[Decision]:
+    return [run_request(snapshot, request) for request in requests]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared planning pool, started on first use."""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def run_requests_in_pool(
+    snapshot: MapSnapshot, requests: Sequence[PlanningRequest], workers: int
+) -> List[Decision]:
+    """Plan the requests across worker processes.
+
+    Requests are split into contiguous chunks and the results are joined back in
+    request order, so the outcome is the same as run_requests.
+    """
+    chunk_size = math.ceil(len(requests) / workers)
+    chunks = [
+        requests[i : i + chunk_size] for i in range(0, len(requests), chunk_size)
+    ]
+    decisions: List[Decision] = []
+    for result in get_pool(workers).map(
+        run_requests, [snapshot] * len(chunks), chunks
+    ):
+        decisions.extend(result)
+    return decisions
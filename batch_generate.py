@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Generate many floors without running the game and collect stats about them.
+
+Every (seed, floor) pair is generated in a worker process. The tiles and
+markers of each floor are written in the maps format (see maps.py) as
+seed<seed>_floor<floor>, and stats.csv gets one row per floor:
+
+    python batch_generate.py --seeds 100 --floors 1 2 3 4 --workers 4 --out generated
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import os
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+import factions
+from game_map import GameMap
+import maps
+import setup_game
+import tile_types
+
+STATS_FIELDS = [
+    "seed",
+    "floor",
+    "layout",
+    "width",
+    "height",
+    "generation_ms",
+    "floor_cells",
+    "reachable_cells",
+    "regions",
+    "monsters",
+    "monsters_reachable",
+    "monster_density",
+    "items",
+    "stairs_reachable",
+]
+
+# (seed, floor, map width, map height, layout or None, output directory)
+Job = Tuple[int, int, int, int, str, str]
+
+
+def floor_markers(game_map: GameMap) -> np.ndarray:
+    """Return the markers layer for the entities of a generated floor."""
+    markers = np.zeros((game_map.width, game_map.height), dtype=np.uint8)
+    for item in game_map.items:
+        markers[item.x, item.y] = maps.MARKER_ITEM
+    for actor in game_map.actors:
+        if actor.faction == factions.HOSTILE:
+            markers[actor.x, actor.y] = maps.MARKER_ENEMY
+    player = game_map.engine.player
+    markers[player.x, player.y] = maps.MARKER_PLAYER
+    return markers
+
+
+def floor_stats(game_map: GameMap) -> Dict[str, object]:
+    """Return the stats of a generated floor, measured from the player's position."""
+    player = game_map.engine.player
+    labels = game_map.region_labels
+    reachable = labels == labels[player.x, player.y]
+    monsters = [actor for actor in game_map.actors if actor.faction == factions.HOSTILE]
+    floor_cells = int(np.count_nonzero(game_map.walkable))
+    stairs = game_map.tiles == tile_types.down_stairs
+    return {
+        "floor_cells": floor_cells,
+        "reachable_cells": int(np.count_nonzero(reachable)),
+        "regions": len(np.unique(labels[game_map.walkable])),
+        "monsters": len(monsters),
+        "monsters_reachable": sum(1 for actor in monsters if reachable[actor.x, actor.y]),
+        "monster_density": round(len(monsters) / max(floor_cells, 1), 5),
+        "items": len(list(game_map.items)),
+        "stairs_reachable": int(np.count_nonzero(stairs & reachable)),
+    }
+
+
+def generate(job: Job) -> Dict[str, object]:
+    """Generate and save one floor, return its stats row."""
+    seed, floor, width, height, layout, out = job
+    start = time.perf_counter()
+    engine = setup_game.new_floor(floor, width, height, seed=seed, layout=layout)
+    elapsed = time.perf_counter() - start
+
+    game_map = engine.game_map
+    maps.save_map(f"seed{seed}_floor{floor}", game_map.tiles, floor_markers(game_map), out)
+    row: Dict[str, object] = {
+        "seed": seed,
+        "floor": floor,
+        "layout": "city" if floor == 1 else engine.game_world.layout_for_floor(floor),
+        "width": game_map.width,
+        "height": game_map.height,
+        "generation_ms": round(elapsed * 1000, 2),
+    }
+    row.update(floor_stats(game_map))
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--floors", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--width", type=int, default=80)
+    parser.add_argument("--height", type=int, default=43)
+    parser.add_argument("--layout", default=None,
+                        help="layout of the dungeon floors: caves, rooms or a map name from "
+                             "assets/maps, the game's choice by default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default="generated")
+    args = parser.parse_args()
+
+    jobs: List[Job] = [
+        (seed, floor, args.width, args.height, args.layout, args.out)
+        for seed in range(args.first_seed, args.first_seed + args.seeds)
+        for floor in args.floors
+    ]
+    os.makedirs(args.out, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(args.out, "stats.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STATS_FIELDS)
+        writer.writeheader()
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                rows = pool.map(generate, jobs, chunksize=max(1, len(jobs) // (args.workers * 4)))
+                writer.writerows(rows)
+        else:
+            writer.writerows(map(generate, jobs))
+    print(f"{len(jobs)} floors in {time.perf_counter() - start:.1f}s, written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
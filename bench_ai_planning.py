@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark batched AI planning in this process against the process pool.
+
+Builds a large open floor, fills it with monsters and times a number of batched
+enemy turns for each worker count. Prints one row per monster count, which shows
+where the pool starts to pay off on the current machine:
+
+    python bench_ai_planning.py --size 200 --monsters 32 128 512 --workers 2 4
+"""
+import argparse
+import copy
+import random
+import time
+
+import numpy as np  # type: ignore
+
+import ai_planning
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+import tile_types
+
+
+def build_engine(size: int, monsters: int, seed: int, workers: int) -> Engine:
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+
+    player = copy.deepcopy(entity_factories.player)
+    engine = Engine(player=player)
+    engine.batched_ai_turns = True
+    engine.ai_workers = workers
+
+    game_map = GameMap(engine, size, size, entities=[player])
+    game_map.set_tiles((slice(1, -1), slice(1, -1)), tile_types.floor)
+    # Scatter some pillars so the paths are not straight lines.
+    pillars = rng.random((size, size)) < 0.08
+    pillars[size // 2, size // 2] = False
+    game_map.set_tiles(pillars, tile_types.wall)
+    game_map.build_region_graph()
+    engine.game_map = game_map
+
+    player.place(size // 2, size // 2, game_map)
+    free = np.argwhere(game_map.walkable)
+    free = free[(free[:, 0] != size // 2) | (free[:, 1] != size // 2)]
+    for x, y in free[rng.choice(len(free), monsters, replace=False)]:
+        entity_factories.orc.spawn(game_map, int(x), int(y))
+
+    game_map.visible[:] = True
+    game_map.known[:] = True
+    return engine
+
+
+def run(size: int, monsters: int, seed: int, workers: int, turns: int) -> tuple:
+    engine = build_engine(size, monsters, seed, workers)
+    start = time.perf_counter()
+    for _ in range(turns):
+        engine.handle_enemy_turns()
+    elapsed = (time.perf_counter() - start) / turns
+    positions = sorted((actor.x, actor.y) for actor in engine.game_map.actors)
+    return elapsed, positions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--monsters", type=int, nargs="+", default=[16, 64, 256, 1024])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Always use the pool when workers are given, to find the crossover.
+    ai_planning.POOL_MIN_REQUESTS = 0
+
+    header = ["monsters", "in-process ms"] + [f"{w} workers ms" for w in args.workers]
+    print(" | ".join(header))
+    for monsters in args.monsters:
+        baseline, expected = run(args.size, monsters, args.seed, 0, args.turns)
+        row = [str(monsters), f"{baseline * 1000:.1f}"]
+        for workers in args.workers:
+            run(args.size, monsters, args.seed, workers, 1)  # Start the pool.
+            elapsed, positions = run(args.size, monsters, args.seed, workers, args.turns)
+            assert positions == expected, "pooled planning diverged"
+            row.append(f"{elapsed * 1000:.1f}")
+        print(" | ".join(row))
+
+
+if __name__ == "__main__":
+    main()
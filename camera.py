@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from game_map import GameMap
+
+
+class Camera:
+    """
+    The window of the map drawn on the console.
+
+    The camera follows a point, usually the player, and stops at the map edges.
+    Maps smaller than the window are drawn from the top left corner as before.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        # Map coordinates of the top left cell of the window.
+        self.x = 0
+        self.y = 0
+
+    def center_on(self, x: int, y: int, game_map: GameMap) -> None:
+        self.x = max(0, min(x - self.width // 2, game_map.width - self.width))
+        self.y = max(0, min(y - self.height // 2, game_map.height - self.height))
+
+    def view(self, game_map: GameMap) -> Tuple[slice, slice]:
+        """Return the slices of the map arrays inside the window."""
+        return (
+            slice(self.x, min(self.x + self.width, game_map.width)),
+            slice(self.y, min(self.y + self.height, game_map.height)),
+        )
+
+    def to_console(self, x: int, y: int) -> Tuple[int, int]:
+        """Convert map coordinates to console coordinates."""
+        return x - self.x, y - self.y
+
+    def on_screen(self, x: int, y: int) -> bool:
+        """Return True if the console position x, y is inside the window."""
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def to_map(self, x: int, y: int) -> Tuple[int, int]:
+        """Convert console coordinates to map coordinates."""
+        return x + self.x, y + self.y
+
+    def in_view(self, x: int, y: int) -> bool:
+        """Return True if the map position x, y is inside the window."""
+        return 0 <= x - self.x < self.width and 0 <= y - self.y < self.height
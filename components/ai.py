@@ -3,10 +3,10 @@ from __future__ import annotations
 import random
 from typing import List, Optional, Tuple, TYPE_CHECKING
 
-import numpy as np  # type: ignore
-import tcod
 import color
 
+import ai_planning
+import factions
 from actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
 
 if TYPE_CHECKING:
@@ -23,34 +23,57 @@ class BaseAI(Action):
     def perform(self) -> None:
         raise NotImplementedError()
 
-    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
-        """Compute and return a path to the target position.
+    def plan(self) -> Action:
+        """Return the action this AI wants to take, without performing it.
 
-        If there is no valid path then returns an empty list.
+        Decision making runs on a MapSnapshot: the one shared by the current
+        batched turn, or a fresh one of the current map. AIs which don't split
+        planning from acting return themselves and are performed as usual.
         """
-        # Copy the walkable array.
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an enitiy blocks movement and the cost isn't zero (blocking.)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position.
-                # A lower number means more enemies will crowd behind each other in
-                # hallways.  A higher number means enemies will take longer paths in
-                # order to surround the player.
-                cost[entity.x, entity.y] += 10
-
-        # Create a graph from the cost array and pass that graph to a new pathfinder.
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
-        pathfinder = tcod.path.Pathfinder(graph)
+        snapshot = self.engine.ai_snapshot or ai_planning.MapSnapshot(
+            self.engine.game_map, copy_arrays=False
+        )
+        request = self.planning_request(snapshot)
+        if request is None:
+            return self
+        return self.apply_decision(ai_planning.run_request(snapshot, request), snapshot)
+
+    def planning_request(
+        self, snapshot: ai_planning.MapSnapshot
+    ) -> Optional[ai_planning.PlanningRequest]:
+        """Describe this AI's decision for the planners in ai_planning.
+
+        Returns None if this AI can't be planned away from the live map.
+        """
+        return None
 
-        pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
+    def apply_decision(
+        self, decision: ai_planning.Decision, snapshot: ai_planning.MapSnapshot
+    ) -> Action:
+        """Turn a planner decision into an action, spending movement and attack points."""
+        raise NotImplementedError()
 
-        # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
+        """Compute and return a path to the target position.
 
-        # Convert from List[List[int]] to List[Tuple[int, int]].
-        return [(index[0], index[1]) for index in path]
+        If there is no valid path then returns an empty list.
+        """
+        # Цель в другой области: путь не ищем и массив стоимостей не строим
+        if not self.entity.gamemap.same_region((self.entity.x, self.entity.y), (dest_x, dest_y)):
+            return []
+        # During a batched turn every AI plans against the same cost array.
+        if self.engine.ai_snapshot is not None:
+            cost = self.engine.ai_snapshot.cost
+        else:
+            cost = self.entity.gamemap.get_path_cost()
+
+        return ai_planning.find_path(
+            cost,
+            (self.entity.x, self.entity.y),
+            (dest_x, dest_y),
+            self.entity.gamemap.get_region_graph(),
+            self.entity.gamemap.region_labels,
+        )
     
     def take_qturn(self) -> None: # Допустим, у вас есть такой метод
         # Пополняем qn_remainder каждый ход
@@ -75,81 +98,113 @@ class BaseAI(Action):
         return False
 
 
+class MonsterGroup:
+    """
+    A group of monsters spawned together from a MONSTER_GROUP_TEMPLATES entry.
+    The leader plans a path for the whole group, the followers keep their formation
+    offset relative to the leader and only pathfind on their own when blocked.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.members: List[Actor] = []
+        self.offsets: List[Tuple[int, int]] = []
+
+    def add_member(self, actor: Actor, offset: Tuple[int, int]) -> None:
+        self.members.append(actor)
+        self.offsets.append(offset)
+        actor.ai.group = self
+
+    @property
+    def leader(self) -> Optional[Actor]:
+        """
+        The first living member which chases its targets leads the group.
+
+        Ranged members keep their distance instead of closing in, so one only
+        leads when no melee member is left.
+        """
+        living = [member for member in self.members if member.is_alive]
+        for member in living:
+            if isinstance(member.ai, HostileEnemy) and not isinstance(member.ai, HostileRanged):
+                return member
+        return living[0] if living else None
+
+    def slot_for(self, actor: Actor) -> Tuple[int, int]:
+        """Return the formation cell this actor should stand on."""
+        leader = self.leader
+        leader_dx, leader_dy = self.offsets[self.members.index(leader)]
+        dx, dy = self.offsets[self.members.index(actor)]
+        return leader.x + dx - leader_dx, leader.y + dy - leader_dy
+
+
 class HostileEnemy(BaseAI):
     def __init__(self, entity: Actor):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = []
-        self.aggression_config = {
-            "player": 1.0,  # Полная агрессия к игроку
-            "friendly_npc": 0.5,  # Половинная агрессия к NPC
-            "hostile_enemy": 0.0,  # Нет агрессии к другим врагам
-        }
+        self.group: Optional[MonsterGroup] = None
         self._cooldown = 0
+
+    def __setstate__(self, state: dict) -> None:
+        # В старых сохранениях агрессия хранилась в самом ИИ, теперь она в Engine.relations
+        state.pop("aggression_config", None)
+        state.setdefault("group", None)
+        self.__dict__.update(state)
     
     def set_aggression(self, target_type: str, value: float) -> None:
-        """Установить уровень агрессии к определенному типу целей"""
-        if value < 0.0 or value > 1.0:
-            raise ValueError("Уровень агрессии должен быть между 0.0 и 1.0")
-        self.aggression_config[target_type] = value
+        """Установить уровень агрессии фракции этого монстра к типу целей"""
+        factions.set_aggression(
+            self.engine.relations,
+            self.entity.faction, factions.faction_id(target_type), value
+        )
+
+    @property
+    def is_follower(self) -> bool:
+        """True if this monster moves in formation behind another group member."""
+        return self.group is not None and self.group.leader is not self.entity
+
+    def get_formation(self) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """Return the (slot, leader position) a follower keeps formation with."""
+        if not self.is_follower:
+            return None
+        leader = self.group.leader
+        return self.group.slot_for(self.entity), (leader.x, leader.y)
 
     def get_target_aggression(self, target: Actor) -> float:
         """Получить уровень агрессии к конкретной цели"""
-        if target is self.engine.player:
-            return self.aggression_config["player"]
-        elif isinstance(target.ai, FriendlyNPC):
-            return self.aggression_config["friendly_npc"]
-        elif isinstance(target.ai, HostileEnemy):
-            return self.aggression_config["hostile_enemy"]
-        elif isinstance(target.ai, HostileRanged):
-            return self.aggression_config["hostile_enemy"]
-        return 0.0
-    
+        return float(self.engine.relations[self.entity.faction, target.faction])
+
     def perform(self) -> None:
-        # Поиск ближайшей цели с учетом агрессии
-        closest_target = None
-        closest_distance = float('inf')
-        
-        # Проверяем всех акторов
-        for actor in self.engine.game_map.actors:
-            if actor is self.entity:
-                continue
-                
-            aggression = self.get_target_aggression(actor)
-            if aggression <= 0:
-                continue
-                
-            distance = self.entity.distance(actor.x, actor.y)
-            # Учитываем агрессию при расчете эффективного расстояния
-            effective_distance = distance / aggression
-            
-            if effective_distance < closest_distance:
-                closest_target = actor
-                closest_distance = effective_distance
-        if not closest_target:
-            return WaitAction(self.entity).perform()
-        dx = closest_target.x - self.entity.x
-        dy = closest_target.y - self.entity.y
-        distance = max(abs(dx), abs(dy))
-        if self.engine.game_map.visible[self.entity.x, self.entity.y]:
-            if distance <= 1:
-                self.take_qturn()
-                if self.can_attack(100):
-                    self.entity.fighter.qn_remainder -= 100
-                    return MeleeAction(self.entity, dx, dy).perform()
-                else:
-                    return WaitAction(self.entity)
-            self.path = self.get_path_to(closest_target.x, closest_target.y)
-        if self.path:
+        return self.plan().perform()
+
+    def planning_request(
+        self, snapshot: ai_planning.MapSnapshot
+    ) -> ai_planning.PlanningRequest:
+        return (
+            "hostile",
+            snapshot.index[self.entity],
+            (self.engine.relations[self.entity.faction], self.get_formation(), self.path),
+        )
+
+    def apply_decision(
+        self, decision: ai_planning.Decision, snapshot: ai_planning.MapSnapshot
+    ) -> Action:
+        kind = decision[0]
+        if kind == "attack":
+            self.take_qturn()
+            if self.can_attack(100):
+                self.entity.fighter.qn_remainder -= 100
+                return MeleeAction(self.entity, decision[1], decision[2])
+            return WaitAction(self.entity)
+        if kind == "move":
+            self.path = decision[1]
             self.take_mturn()
             if self.can_move(100):
                 self.entity.fighter.ms_remainder -= 100
                 dest_x, dest_y = self.path.pop(0)
                 return MovementAction(
                     self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
-                ).perform()
-            else:
-                return WaitAction(self.entity)
-        return WaitAction(self.entity).perform()
+                )
+        return WaitAction(self.entity)
 
 class HostileRanged(HostileEnemy):
     def __init__(self, entity: Actor):
@@ -160,81 +215,41 @@ class HostileRanged(HostileEnemy):
         self._qcooldown = 0  # Текущее время перезарядки     
         self._mcooldown = 0  # Текущее время перезарядки    
         self.last_known_position: Optional[Tuple[int, int]] = None
-    
-    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
-        """Compute and return a path to the target position.
-
-        If there is no valid path then returns an empty list.
-        """
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an enitiy blocks movement and is not the AI itself.
-            if entity.blocks_movement and entity != self.entity:
-                # Modify the cost of all passable neighbor cells to convey blockage.
-                cost[entity.x, entity.y] += 10
-
-        # Create a graph from the cost array and pass that graph to a new pathfinder.
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
-        pathfinder = tcod.path.Pathfinder(graph)
 
-        pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
-
-        # Compute a path to the destination.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
-
-        # If the path is empty, then there was no path to the target.
-        if not path:
-            return []
-
-        # Convert from List[List[int]] to List[Tuple[int, int]].
-        return [(index[0], index[1]) for index in path]
-
-    def perform(self) -> None:
-        """Выполняет действия ИИ."""
-        target = self.engine.player #Всегда цель - игрок
-        dx = target.x - self.entity.x
-        dy = target.y - self.entity.y
-        distance = max(abs(dx), abs(dy))  # Chebyshev distance
-        if self.engine.game_map.known[self.entity.x, self.entity.y]:
-            if distance < self.min_range:
-                #Пытаемся отойти от цели
-                new_x = self.entity.x - dx  # Двигаемся в противоположном направлении от игрока
-                new_y = self.entity.y - dy
-                if self.engine.game_map.tiles["walkable"][new_x, new_y] and not self.engine.game_map.get_blocking_entity_at_location(new_x, new_y):
-                    #Если клетка проходима и не заблокирована, двигаемся туда
-                    self.take_mturn()
-                    if self.can_move(100) == True:
-                        self.entity.fighter.qn_remainder -= 100
-                        return MovementAction(self.entity, -dx, -dy).perform()
-                    else:
-                        return WaitAction(self.entity).perform()
-                else:
-        
-                    return WaitAction(self.entity).perform()
-            if distance <= self.max_range:
-                self.take_qturn()
-                if self.can_attack(200) == True:
-                    # Атакуем, если цель в пределах досягаемости
-                    self.entity.fighter.qn_remainder -= 200
-                    return MeleeAction(self.entity, dx, dy).perform()
-                else:
-                    return WaitAction(self.entity).perform()
-            elif distance > self.max_range:
-                # Двигаемся ближе к цели
-                self.path = self.get_path_to(target.x, target.y)
-                if self.path: #Проверяем, что путь не пустой
-                    dest_x, dest_y = self.path.pop(0)
-                    self.take_mturn
-                    if self.can_move(100) == True:
-                        self.entity.fighter.ms_remainder -= 100
-                        return MovementAction(
-                            self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
-                        ).perform()
-                    else:
-                        return WaitAction(self.entity).perform
-        else: #Если не знаем ничего - ждём
-            return WaitAction(self.entity).perform()
+    def planning_request(
+        self, snapshot: ai_planning.MapSnapshot
+    ) -> ai_planning.PlanningRequest:
+        return (
+            "ranged",
+            snapshot.index[self.entity],
+            (self.min_range, self.max_range, self.get_formation(), self.path),
+        )
+
+    def apply_decision(
+        self, decision: ai_planning.Decision, snapshot: ai_planning.MapSnapshot
+    ) -> Action:
+        kind = decision[0]
+        if kind == "retreat":
+            self.take_mturn()
+            if self.can_move(100) == True:
+                self.entity.fighter.qn_remainder -= 100
+                return MovementAction(self.entity, decision[1], decision[2])
+        elif kind == "attack":
+            self.take_qturn()
+            if self.can_attack(200) == True:
+                # Атакуем, если цель в пределах досягаемости
+                self.entity.fighter.qn_remainder -= 200
+                return MeleeAction(self.entity, decision[1], decision[2])
+        elif kind == "move":
+            self.path = decision[1]
+            self.take_mturn()
+            if self.can_move(100) == True:
+                self.entity.fighter.ms_remainder -= 100
+                dest_x, dest_y = self.path.pop(0)
+                return MovementAction(
+                    self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
+                )
+        return WaitAction(self.entity)
 
 class Player(BaseAI):
     def __init__(self, entity: Actor):
@@ -290,61 +305,44 @@ class FriendlyNPC(BaseAI):
             )
 
     def perform(self) -> None:
-        if not self.in_party:
-            # Если NPC не в группе, просто стоит на месте
-            return WaitAction(self.entity).perform()
-        # Поиск ближайшего врага
-        closest_enemy = None
-        closest_distance = float('inf')
-        
-        for actor in self.engine.game_map.actors:
-            if actor.ai and isinstance(actor.ai, HostileEnemy):
-                distance = self.entity.distance(actor.x, actor.y)
-                if distance < closest_distance:
-                    closest_enemy = actor
-                    closest_distance = distance
-                    
-        # Если есть враг поблизости
-        if closest_enemy and closest_distance <= 8:  # Радиус обнаружения
-            self.current_target = closest_enemy
-            
-            if closest_distance <= 1:  # Если враг рядом - атакуем
-                dx = closest_enemy.x - self.entity.x
-                dy = closest_enemy.y - self.entity.y
-                self.take_qturn
-                if self.can_attack(100):
-                    return MeleeAction(self.entity, dx, dy).perform()
-                else:
-                    return WaitAction(self.entity)  
-            else:  # Иначе двигаемся к врагу
-                self.path = self.get_path_to(closest_enemy.x, closest_enemy.y)
-                if self.path:
-                    self.take_mturn()
-                    if self.can_move(100):
-                        dest_x, dest_y = self.path.pop(0)
-                        return MovementAction(
-                            self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
-                        ).perform()
-                    else:
-                        return WaitAction(self.entity)
-                    
-        # Если нет врагов - следуем за игроком
-        target = self.engine.player
-        dx = target.x - self.entity.x
-        dy = target.y - self.entity.y
-        distance = max(abs(dx), abs(dy))
-        if distance > 2:  # Держим дистанцию в 3 клетки
-            self.path = self.get_path_to(target.x, target.y)
-            if self.path:
-                self.take_mturn
-                if self.can_move(100):
-                    dest_x, dest_y = self.path.pop(0)
-                    return MovementAction(
-                        self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
-                    ).perform()
-                else:
-                    WaitAction(self.entity)
-        return WaitAction(self.entity).perform()
+        return self.plan().perform()
+
+    def planning_request(
+        self, snapshot: ai_planning.MapSnapshot
+    ) -> ai_planning.PlanningRequest:
+        return (
+            "friendly",
+            snapshot.index[self.entity],
+            (self.engine.relations[self.entity.faction], self.in_party, self.path),
+        )
+
+    def apply_decision(
+        self, decision: ai_planning.Decision, snapshot: ai_planning.MapSnapshot
+    ) -> Action:
+        kind = decision[0]
+        if kind == "attack":  # Если враг рядом - атакуем
+            self.current_target = snapshot.actors[decision[3]]
+            self.take_qturn
+            if self.can_attack(100):
+                return MeleeAction(self.entity, decision[1], decision[2])
+        elif kind == "chase":  # Иначе двигаемся к врагу
+            self.current_target = snapshot.actors[decision[2]]
+            self.path = decision[1]
+            self.take_mturn()
+            if self.can_move(100):
+                dest_x, dest_y = self.path.pop(0)
+                return MovementAction(
+                    self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
+                )
+        elif kind == "follow":  # Если нет врагов - следуем за игроком
+            self.path = decision[1]
+            self.take_mturn
+            if self.can_move(100):
+                dest_x, dest_y = self.path.pop(0)
+                return MovementAction(
+                    self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
+                )
+        return WaitAction(self.entity)
 
 
 class ConfusedEnemy(BaseAI):
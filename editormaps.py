@@ -1,9 +1,29 @@
+"""
+Редактор карт.
+
+    python editormaps.py [имя_карты]
+
+Карта сохраняется в assets/maps в том же формате, который загружает игра
+(слои tiles и markers, см. maps.py). Если карта с таким именем уже есть, она
+открывается для редактирования. S сохраняет карту, при выходе она тоже
+сохраняется.
+"""
+import sys
+
+import numpy as np
 import pygame
 
+import maps
+import tile_types
+
+MAP_NAME = sys.argv[1] if len(sys.argv) > 1 else "custom"
+
 # --- Параметры ---
 TILE_SIZE = 10  # Размер одного тайла в пикселях
 GRID_WIDTH = 80  # Количество тайлов по ширине
 GRID_HEIGHT = 43 # Количество тайлов по высоте
+if MAP_NAME in maps.available_maps():
+    GRID_WIDTH, GRID_HEIGHT = maps.load_layer(MAP_NAME).shape
 SCREEN_WIDTH = GRID_WIDTH * TILE_SIZE
 SCREEN_HEIGHT = GRID_HEIGHT * TILE_SIZE
 
@@ -14,6 +34,9 @@ GRAY = (200, 200, 200)
 RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 GREEN = (0, 255, 0)
+ORANGE = (255, 140, 50)
+YELLOW = (255, 220, 0)
+BROWN = (130, 110, 50)
 
 # Доступные тайлы (простые цвета для примера)
 # Можно использовать изображения, но для простоты начнем с цветов
@@ -22,85 +45,151 @@ TILES = {
     "wall": BLACK,
     "player": RED,
     "enemy": BLUE,
-    "item": GREEN
+    "item": GREEN,
+    "city_wall": BROWN,
+    "door": ORANGE,
+    "down_stairs": YELLOW,
+    "portal_blue": (0, 128, 255),
+    "portal_red": (255, 128, 128),
+}
+
+# Во что превращается каждый тайл редактора в игре: (ID тайла, маркер спавна)
+TILE_EXPORT = {
+    "empty": (tile_types.floor, maps.MARKER_NONE),
+    "wall": (tile_types.wall, maps.MARKER_NONE),
+    "player": (tile_types.floor, maps.MARKER_PLAYER),
+    "enemy": (tile_types.floor, maps.MARKER_ENEMY),
+    "item": (tile_types.floor, maps.MARKER_ITEM),
+    "city_wall": (tile_types.city_wall, maps.MARKER_NONE),
+    "door": (tile_types.door, maps.MARKER_NONE),
+    "down_stairs": (tile_types.down_stairs, maps.MARKER_NONE),
+    "portal_blue": (tile_types.portal_blue, maps.MARKER_NONE),
+    "portal_red": (tile_types.portal_red, maps.MARKER_NONE),
 }
 
+
 # --- Инициализация ---
 pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+# Справа от карты панель с палитрой; большие карты прокручиваются стрелками
+VIEW_WIDTH = min(GRID_WIDTH, 120)
+VIEW_HEIGHT = min(GRID_HEIGHT, 80)
+PANEL_WIDTH = 200
+screen = pygame.display.set_mode((VIEW_WIDTH * TILE_SIZE + PANEL_WIDTH, VIEW_HEIGHT * TILE_SIZE))
 pygame.display.set_caption("Tile Editor")
-
-# Словарь для хранения состояния каждого тайла на сетке
-# grid[y][x] = "tile_key"
-# Поменяли местами GRID_WIDTH и GRID_HEIGHT при создании
-grid = [["wall" for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+clock = pygame.time.Clock()
 
 # Переменные для выбора тайла
 current_tile_index = 0
 tile_keys = list(TILES.keys()) # Список ключей доступных тайлов
 
+# Индекс тайла палитры для каждой клетки, grid[x, y]
+grid = np.full((GRID_WIDTH, GRID_HEIGHT), tile_keys.index("wall"), dtype=np.uint8)
+
+# Таблицы по индексу палитры: цвет, ID тайла игры и маркер спавна
+PALETTE_COLORS = np.array([TILES[key] for key in tile_keys], dtype=np.uint8)
+EXPORT_TILES = np.array([TILE_EXPORT[key][0] for key in tile_keys], dtype=tile_types.tile_id_dt)
+EXPORT_MARKERS = np.array([TILE_EXPORT[key][1] for key in tile_keys], dtype=np.uint8)
+
+# Шрифты и подписи создаются один раз
+font = pygame.font.Font(None, 24) # Шрифт для подписей
+big_font = pygame.font.Font(None, 30)
+title_label = font.render("Choose Tile:", True, WHITE)
+tile_labels = [font.render(key, True, WHITE) for key in tile_keys]
+selected_labels = [big_font.render(f"Selected: {key}", True, WHITE) for key in tile_keys]
+
+# Готовая картинка одного тайла каждого вида, вместе с границей
+def make_tile_surface(color):
+    surface = pygame.Surface((TILE_SIZE, TILE_SIZE))
+    surface.fill(color)
+    pygame.draw.rect(surface, GRAY, surface.get_rect(), 1) # Граница тайла
+    return surface
+
+tile_surfaces = [make_tile_surface(TILES[key]) for key in tile_keys]
+
+# Вся карта нарисована на одной поверхности, в кадр она попадает одним blit
+grid_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+
 # Переменные для отслеживания нажатия мыши
 drawing = False
 
-# --- Функции ---
-def draw_grid():
-    """Рисует сетку и тайлы"""
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            tile_key = grid[y][x]
-            color = TILES.get(tile_key, GRAY) # Получаем цвет по ключу, или серый если нет
+# Прокрутка: левая верхняя видимая клетка
+view_x = 0
+view_y = 0
 
-            # Рисуем сам тайл
-            pygame.draw.rect(screen, color, (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+# --- Функции ---
+def rebuild_grid_surface():
+    """Рисует всю сетку заново из массива цветов через surfarray"""
+    pixels = PALETTE_COLORS[grid] # (ширина, высота, 3)
+    pixels = pixels.repeat(TILE_SIZE, axis=0).repeat(TILE_SIZE, axis=1)
+    # Границы тайлов: первый и последний пиксель каждой клетки
+    edge = np.zeros(TILE_SIZE, dtype=bool)
+    edge[[0, -1]] = True
+    border_x = np.tile(edge, GRID_WIDTH)
+    border_y = np.tile(edge, GRID_HEIGHT)
+    pixels[border_x[:, None] | border_y[None, :]] = GRAY
+    pygame.surfarray.blit_array(grid_surface, pixels)
 
-            # Рисуем границы тайла
-            pygame.draw.rect(screen, GRAY, (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE), 1) # Толщина 1 пиксель
+def paint_tile(x, y, index):
+    """Меняет одну клетку и перерисовывает только её"""
+    grid[x, y] = index
+    grid_surface.blit(tile_surfaces[index], (x * TILE_SIZE, y * TILE_SIZE))
 
 def get_mouse_tile_pos():
     """Возвращает координаты тайла, над которым находится мышь"""
     mouse_x, mouse_y = pygame.mouse.get_pos()
-    if 0 <= mouse_x < SCREEN_WIDTH and 0 <= mouse_y < SCREEN_HEIGHT:
-        return mouse_x // TILE_SIZE, mouse_y // TILE_SIZE
+    if 0 <= mouse_x < VIEW_WIDTH * TILE_SIZE and 0 <= mouse_y < VIEW_HEIGHT * TILE_SIZE:
+        return mouse_x // TILE_SIZE + view_x, mouse_y // TILE_SIZE + view_y
     return None, None
 
-def export_grid_to_data():
-    """Экспортирует текущую сетку в виде данных (список списков строк)"""
-    # Транспонируем сетку перед экспортом
-    transposed_grid = list(zip(*grid))  # Используем zip для транспонирования
-    data = []
-    for row in transposed_grid:
-        data_row = []
-        for tile_key in row:
-            data_row.append(tile_key) # Добавляем ключ тайла
-        data.append(data_row)
-    return data
+def export_grid_to_layers():
+    """Переводит сетку в слои tiles и markers формата карт игры, размером (ширина, высота)"""
+    return EXPORT_TILES[grid], EXPORT_MARKERS[grid]
 
-def display_tile_palette():
-    """Отображает палитру доступных тайлов для выбора"""
-    palette_x = SCREEN_WIDTH + 20 # Положение палитры справа от основной сетки
-    palette_y_start = 20
-    tile_palette_spacing = TILE_SIZE + 10 # Отступ между тайлами в палитре
+def import_layers_to_grid(tiles, markers):
+    """Заполняет сетку по слоям карты игры"""
+    by_tile = np.full(len(tile_types.TILES), tile_keys.index("wall"), dtype=np.uint8)
+    by_marker = np.full(256, tile_keys.index("empty"), dtype=np.uint8)
+    for i, key in enumerate(tile_keys):
+        tile_id, marker = TILE_EXPORT[key]
+        if marker == maps.MARKER_NONE:
+            by_tile[tile_id] = i
+        else:
+            by_marker[marker] = i
+    grid[:] = np.where(markers != maps.MARKER_NONE, by_marker[markers], by_tile[tiles])
 
-    font = pygame.font.Font(None, 24) # Шрифт для подписей
+def save_map():
+    tiles, markers = export_grid_to_layers()
+    maps.save_map(MAP_NAME, tiles, markers)
+    print(f"Saved map {MAP_NAME!r} to {maps.layer_path(MAP_NAME)}")
 
-    screen.blit(font.render("Choose Tile:", True, WHITE), (palette_x, palette_y_start - 30))
+def palette_rect(i):
+    palette_x = VIEW_WIDTH * TILE_SIZE + 20 # Положение палитры справа от основной сетки
+    palette_y_start = 50
+    tile_palette_spacing = TILE_SIZE + 10 # Отступ между тайлами в палитре
+    return pygame.Rect(palette_x, palette_y_start + i * tile_palette_spacing, TILE_SIZE, TILE_SIZE)
+
+def display_tile_palette():
+    """Отображает палитру доступных тайлов для выбора"""
+    screen.blit(title_label, (palette_rect(0).x, 20))
 
-    for i, tile_key in enumerate(tile_keys):
-        color = TILES[tile_key]
-        rect = pygame.Rect(palette_x, palette_y_start + i * tile_palette_spacing, TILE_SIZE, TILE_SIZE)
+    for i in range(len(tile_keys)):
+        rect = palette_rect(i)
 
         # Выделяем выбранный тайл
         if i == current_tile_index:
-            pygame.draw.rect(screen, WHITE, rect, 3) # Белая рамка
+            pygame.draw.rect(screen, WHITE, rect.inflate(4, 4), 3) # Белая рамка
 
-        pygame.draw.rect(screen, color, rect)
-        pygame.draw.rect(screen, GRAY, rect, 1) # Граница тайла
+        screen.blit(tile_surfaces[i], rect)
 
         # Добавляем подпись к тайлу
-        text_surface = font.render(tile_key, True, WHITE)
+        text_surface = tile_labels[i]
         screen.blit(text_surface, (rect.right + 5, rect.centery - text_surface.get_height() // 2))
 
 
+if MAP_NAME in maps.available_maps():
+    import_layers_to_grid(maps.load_layer(MAP_NAME), maps.load_markers(MAP_NAME))
+rebuild_grid_surface()
+
 # --- Основной цикл ---
 running = True
 while running:
@@ -108,16 +197,25 @@ while running:
         if event.type == pygame.QUIT:
             running = False
 
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_s:
+                save_map()
+            # Прокрутка больших карт
+            elif event.key == pygame.K_LEFT:
+                view_x = max(view_x - 10, 0)
+            elif event.key == pygame.K_RIGHT:
+                view_x = min(view_x + 10, GRID_WIDTH - VIEW_WIDTH)
+            elif event.key == pygame.K_UP:
+                view_y = max(view_y - 10, 0)
+            elif event.key == pygame.K_DOWN:
+                view_y = min(view_y + 10, GRID_HEIGHT - VIEW_HEIGHT)
+
         # --- Обработка нажатий мыши ---
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1: # Левая кнопка мыши
                 # Проверяем, нажата ли кнопка выбора тайла в палитре
-                palette_x_start = SCREEN_WIDTH + 20
-                palette_y_start = 20
-                tile_palette_spacing = TILE_SIZE + 10
-                for i, tile_key in enumerate(tile_keys):
-                    rect = pygame.Rect(palette_x_start, palette_y_start + i * tile_palette_spacing, TILE_SIZE, TILE_SIZE)
-                    if rect.collidepoint(event.pos):
+                for i in range(len(tile_keys)):
+                    if palette_rect(i).collidepoint(event.pos):
                         current_tile_index = i
                         drawing = False # Останавливаем рисование, пока не выберем тайл
                         break # Выходим из цикла, если кнопка найдена
@@ -134,8 +232,8 @@ while running:
                 grid_x, grid_y = get_mouse_tile_pos()
                 if grid_x is not None and grid_y is not None:
                     # Изменяем тайл только если он отличается, чтобы избежать лишних обновлений
-                    if grid[grid_y][grid_x] != tile_keys[current_tile_index]:
-                        grid[grid_y][grid_x] = tile_keys[current_tile_index]
+                    if grid[grid_x, grid_y] != current_tile_index:
+                        paint_tile(grid_x, grid_y, current_tile_index)
 
         # --- Обработка прокрутки мыши (для выбора тайла) ---
         if event.type == pygame.MOUSEWHEEL:
@@ -147,24 +245,22 @@ while running:
                 current_tile_index = (current_tile_index + 1) % len(tile_keys)
 
     # --- Отрисовка ---
-    screen.fill(WHITE) # Очищаем экран
-    draw_grid()
+    screen.fill(BLACK) # Очищаем экран
+    view = pygame.Rect(view_x * TILE_SIZE, view_y * TILE_SIZE, VIEW_WIDTH * TILE_SIZE, VIEW_HEIGHT * TILE_SIZE)
+    screen.blit(grid_surface, (0, 0), view)
     display_tile_palette()
 
     # Отображаем выбранный тайл внизу экрана
-    font = pygame.font.Font(None, 30)
-    current_tile_key = tile_keys[current_tile_index]
-    current_tile_color = TILES[current_tile_key]
-    pygame.draw.rect(screen, current_tile_color, (10, SCREEN_HEIGHT - 40, 32, 32))
-    pygame.draw.rect(screen, GRAY, (10, SCREEN_HEIGHT - 40, 32, 32), 2)
-    screen.blit(font.render(f"Selected: {current_tile_key}", True, WHITE), (50, SCREEN_HEIGHT - 35))
+    current_tile_color = TILES[tile_keys[current_tile_index]]
+    bottom = VIEW_HEIGHT * TILE_SIZE
+    pygame.draw.rect(screen, current_tile_color, (10, bottom - 40, 32, 32))
+    pygame.draw.rect(screen, GRAY, (10, bottom - 40, 32, 32), 2)
+    screen.blit(selected_labels[current_tile_index], (50, bottom - 35))
 
     pygame.display.flip() # Обновляем экран
+    clock.tick(60)
 
-# --- Экспорт данных после закрытия окна ---
-final_data = export_grid_to_data()
-print("Exported Grid Data (list of lists of tile keys):")
-for row in final_data:
-    print(row)
+# --- Сохранение карты после закрытия окна ---
+save_map()
 
-pygame.quit()
\ No newline at end of file
+pygame.quit()
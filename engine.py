@@ -2,12 +2,17 @@ from __future__ import annotations
 
 import lzma
 import pickle
-from typing import TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
+import numpy as np  # type: ignore
 from tcod.console import Console
 from tcod.map import compute_fov
+from actions import MovementAction
+import ai_planning
+from camera import Camera
 from components.ai import BaseAI
 import exceptions
+import factions
 from message_log import MessageLog
 import render_functions
 from components.Dices import dices
@@ -30,33 +35,176 @@ class Engine:
         self.tracked_monsters = set()  # Set to track killed monster types
         self.move_counter = 0
         self.last_player_position = (player.x, player.y)
-
-    
+        # Plan all enemy turns first and resolve them together.
+        self.batched_ai_turns = False
+        # Worker processes for planning a batched turn, 0 plans in this process.
+        self.ai_workers = 0
+        # Snapshot of the map shared by all AIs while a batched turn is planned.
+        self.ai_snapshot: Optional[ai_planning.MapSnapshot] = None
+        # Directory for memory-mapped map layers, None keeps them in memory.
+        self.map_storage_dir: Optional[str] = None
+        # The map area of the console, above the message log and HP bar.
+        self.camera = Camera(80, 43)
+        # How aggressive every faction is towards the others, saved with the game.
+        self.relations = factions.new_relations()
+
+    def __setstate__(self, state: dict) -> None:
+        # Сохранения старых версий не знают о пакетных ходах, камере и фракциях
+        state.setdefault("batched_ai_turns", False)
+        state.setdefault("ai_workers", 0)
+        state.setdefault("ai_snapshot", None)
+        state.setdefault("map_storage_dir", None)
+        state.setdefault("camera", Camera(80, 43))
+        state.setdefault("relations", factions.new_relations())
+        self.__dict__.update(state)
 
     def handle_enemy_turns(self) -> None:
+        if self.batched_ai_turns:
+            return self.handle_enemy_turns_batched()
+
+        area = self.game_map.active_area(self.player.x, self.player.y)
         for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
+            # Enemies far from the player wait until the player gets closer.
+            if entity.ai and self.game_map.in_area(area, entity.x, entity.y):
                 try:
                     entity.ai.perform()
                 except exceptions.Impossible:
                     pass  # Ignore impossible action exceptions from AI.
 
+    def handle_enemy_turns_batched(self) -> None:
+        """
+        Run the enemy turn in two phases.
+
+        First every AI plans its action against a snapshot of the map, nothing is
+        changed while planning. With ai_workers set, large turns are planned in a
+        process pool. Then attacks and other actions are performed and all moves
+        are resolved together, so two monsters never end up on one tile.
+        """
+        snapshot = ai_planning.MapSnapshot(self.game_map)
+        area = self.game_map.active_area(self.player.x, self.player.y)
+        planners = [
+            actor
+            for actor in snapshot.actors
+            if actor is not self.player
+            and actor.ai
+            and self.game_map.in_area(area, actor.x, actor.y)
+        ]
+        decisions = {}
+        if self.ai_workers > 0:
+            requests = {actor: actor.ai.planning_request(snapshot) for actor in planners}
+            pooled = [actor for actor in planners if requests[actor] is not None]
+            if len(pooled) >= ai_planning.POOL_MIN_REQUESTS:
+                decisions = dict(
+                    zip(
+                        pooled,
+                        ai_planning.run_requests_in_pool(
+                            snapshot, [requests[actor] for actor in pooled], self.ai_workers
+                        ),
+                    )
+                )
+
+        intents = []
+        self.ai_snapshot = snapshot
+        try:
+            for actor in planners:
+                try:
+                    if actor in decisions:
+                        intents.append(actor.ai.apply_decision(decisions[actor], snapshot))
+                    else:
+                        intents.append(actor.ai.plan())
+                except exceptions.Impossible:
+                    pass
+        finally:
+            self.ai_snapshot = None
+
+        moves: List[MovementAction] = []
+        for action in intents:
+            if type(action) is MovementAction:
+                moves.append(action)
+                continue
+            if not action.entity.is_alive:
+                continue  # Killed earlier in this turn.
+            try:
+                action.perform()
+            except exceptions.Impossible:
+                pass
+
+        moves = [move for move in moves if move.entity.is_alive]
+        for move in self.resolve_moves(moves):
+            move.entity.move(move.dx, move.dy)
+
+    def resolve_moves(self, moves: List[MovementAction]) -> List[MovementAction]:
+        """Return the moves which can be carried out together.
+
+        A move is rejected if it leaves the map, hits a wall, runs into an actor
+        which stays in place, or if an earlier move already claimed the same tile.
+        """
+        if not moves:
+            return []
+
+        game_map = self.game_map
+        x = np.array([move.entity.x for move in moves])
+        y = np.array([move.entity.y for move in moves])
+        dest_x = x + np.array([move.dx for move in moves])
+        dest_y = y + np.array([move.dy for move in moves])
+
+        accepted = (
+            (dest_x >= 0) & (dest_x < game_map.width)
+            & (dest_y >= 0) & (dest_y < game_map.height)
+        )
+        dest_x = np.where(accepted, dest_x, 0)
+        dest_y = np.where(accepted, dest_y, 0)
+        accepted &= game_map.walkable[dest_x, dest_y]
+
+        blocked = np.zeros((game_map.width, game_map.height), dtype=bool)
+        for entity in game_map.entities:
+            if entity.blocks_movement:
+                blocked[entity.x, entity.y] = True
+
+        dest_index = dest_x * game_map.height + dest_y
+        while True:
+            # Movers only free their tile if their own move goes through.
+            occupied = blocked.copy()
+            occupied[x[accepted], y[accepted]] = False
+            candidates = np.flatnonzero(accepted & ~occupied[dest_x, dest_y])
+            # The first move to claim a tile gets it.
+            _, first = np.unique(dest_index[candidates], return_index=True)
+            resolved = np.zeros_like(accepted)
+            resolved[candidates[first]] = True
+            if (resolved == accepted).all():
+                break
+            accepted = resolved
+
+        return [move for move, ok in zip(moves, accepted) if ok]
+
     def update_fov(self) -> None:
-        """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
+        """Recompute the visible area based on the players point of view.
+
+        Only the active chunks around the player are computed, so the cost does not
+        grow with the size of the map.
+        """
+        game_map = self.game_map
+        # Clear what the last update marked, everything else is already False.
+        game_map.visible[game_map.fov_area] = False
+        game_map.known[game_map.fov_area] = False
+
+        area = game_map.active_area(self.player.x, self.player.y)
+        game_map.visible[area] = compute_fov(
+            game_map.transparent[area],
+            (self.player.x - area[0].start, self.player.y - area[1].start),
             radius=1000,
         )
+        game_map.fov_area = area
         # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+        game_map.explored[area] |= game_map.visible[area]
 
-        self.game_map.known[:] = self.game_map.visible.copy()
+        game_map.known[area] = game_map.visible[area]
         # Set the last position as visible to the known array
         self.game_map.known[self.last_player_position] = True
 
     def render(self, console: Console) -> None:
-        self.game_map.render(console)
+        self.camera.center_on(self.player.x, self.player.y, self.game_map)
+        self.game_map.render(console, self.camera)
 
         self.message_log.render(console=console, x=21, y=45, width=40, height=5)
 
@@ -78,8 +226,14 @@ class Engine:
         )
 
     def save_as(self, filename: str) -> None:
-        """Save this Engine instance as a compressed file."""
+        """Save this Engine instance as a compressed file.
+
+        Memory-mapped map layers are flushed to their files, not pickled.
+        """
+        self.game_map.flush()
+        self.game_world.saved_storage = self.game_map.storage
         save_data = lzma.compress(pickle.dumps(self))
         with open(filename, "wb") as f:
             f.write(save_data)
+        self.game_world.storage_saved()
 
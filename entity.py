@@ -4,6 +4,7 @@ import copy
 import math
 from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union
 
+import factions
 from render_order import RenderOrder
 
 if TYPE_CHECKING:
@@ -104,6 +105,7 @@ class   Actor(Entity):
         inventory: Inventory,
         level: Level,
         archer:bool = False,
+        faction: int = factions.NEUTRAL,
     ):
         super().__init__(
             x=x,
@@ -129,6 +131,14 @@ class   Actor(Entity):
         self.level = level
         self.level.parent = self
         self.archer = archer
+        self.faction = faction
+
+    def __setstate__(self, state: dict) -> None:
+        if "faction" not in state:
+            # Сохранения до фракций: фракция по классу ИИ
+            ai = state.get("ai")
+            state["faction"] = factions.AI_FACTIONS.get(type(ai).__name__, factions.NEUTRAL)
+        self.__dict__.update(state)
 
     @property
     def is_alive(self) -> bool:
@@ -5,8 +5,11 @@ from components.fighter import Fighter
 from components.inventory import Inventory
 from components.level import Level
 from entity import Actor, Item, Portal
+import factions
 import game_map
 
+import numpy as np  # type: ignore
+
 import color
 
 
@@ -34,6 +37,7 @@ player = Actor(
                     ),
     inventory=Inventory(capacity=26),
     level=Level(level_up_base=5),
+    faction=factions.PLAYER,
 )
 npc = Actor(
     char="@",
@@ -59,6 +63,7 @@ npc = Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=5),
+    faction=factions.FRIENDLY,
 )
 
 "tier 9"
@@ -86,6 +91,7 @@ gob = Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=6),
+    faction=factions.HOSTILE,
 )
 gobf=Actor(
     char="f",
@@ -111,6 +117,7 @@ gobf=Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=7),
+    faction=factions.HOSTILE,
 )
 goba=Actor(
     char="a",
@@ -136,6 +143,7 @@ goba=Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=7),
+    faction=factions.HOSTILE,
 )
 skel=Actor(
     char="s",
@@ -161,6 +169,7 @@ skel=Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=6),
+    faction=factions.HOSTILE,
 )
 "tier 8"
 death=Actor(
@@ -187,6 +196,7 @@ death=Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=10),
+    faction=factions.HOSTILE,
 )
 
 orc = Actor(
@@ -213,6 +223,7 @@ orc = Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=8),
+    faction=factions.HOSTILE,
 )
 troll = Actor(
     char="T",
@@ -238,6 +249,7 @@ troll = Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=30),
+    faction=factions.HOSTILE,
 )
 boss = Actor(
     char="B",
@@ -263,6 +275,7 @@ boss = Actor(
                     ),
     inventory=Inventory(capacity=0),
     level=Level(xp_given=1000),
+    faction=factions.HOSTILE,
 )
 
 confusion_scroll = Item(
@@ -328,4 +341,16 @@ MONSTER_GROUP_TEMPLATES = [
         "name": "gotro",
         "members": [goba, troll],
     },
-]
\ No newline at end of file
+]
+
+# Группы строятся по 3 монстра в ряд
+GROUP_ROW_WIDTH = 3
+
+for template in MONSTER_GROUP_TEMPLATES:
+    template["offsets"] = [
+        (i % GROUP_ROW_WIDTH, i // GROUP_ROW_WIDTH) for i in range(len(template["members"]))
+    ]
+    # Те же смещения массивом, чтобы проверять всю группу одной операцией
+    template["footprint"] = np.array(template["offsets"], dtype=np.intp).reshape(-1, 2)
+
+MONSTER_GROUPS = {template["name"]: template for template in MONSTER_GROUP_TEMPLATES}
@@ -0,0 +1,58 @@
+"""
+Faction registry and the relationship matrix between factions.
+
+Every actor stores the integer ID of its faction. How aggressive one faction is
+towards another is a single lookup: relations[attacker, target], a value between
+0.0 (ignores) and 1.0 (full aggression).
+
+RELATIONS holds the starting values. Every game works on its own copy,
+Engine.relations, so changes are saved with the game and don't leak into the
+next one.
+"""
+from typing import List
+
+import numpy as np  # type: ignore
+
+NEUTRAL = 0
+PLAYER = 1
+FRIENDLY = 2
+HOSTILE = 3
+
+FACTION_NAMES: List[str] = ["neutral", "player", "friendly_npc", "hostile_enemy"]
+
+# Rows are the attacking faction, columns the target. Starting values, see new_relations.
+RELATIONS = np.zeros((len(FACTION_NAMES), len(FACTION_NAMES)), dtype=np.float32)
+RELATIONS[HOSTILE, PLAYER] = 1.0  # Полная агрессия к игроку
+RELATIONS[HOSTILE, FRIENDLY] = 0.5  # Половинная агрессия к NPC
+RELATIONS[FRIENDLY, HOSTILE] = 1.0  # Союзники защищают группу игрока
+
+# Faction of an actor by the class of its AI, for saves made before actors had one.
+AI_FACTIONS = {
+    "Player": PLAYER,
+    "FriendlyNPC": FRIENDLY,
+    "HostileEnemy": HOSTILE,
+    "HostileRanged": HOSTILE,
+    "ConfusedEnemy": HOSTILE,
+    "FearedAi": HOSTILE,
+}
+
+
+def faction_id(name: str) -> int:
+    """Return the ID of a faction by its name."""
+    try:
+        return FACTION_NAMES.index(name)
+    except ValueError:
+        raise ValueError(f"Unknown faction {name!r}.") from None
+
+
+def new_relations() -> np.ndarray:
+    """Return a copy of the starting relations for a new game."""
+    return RELATIONS.copy()
+
+
+def set_aggression(relations: np.ndarray, attacker: int, target: int, value: float) -> None:
+    """Set how aggressive one faction is towards another in relations."""
+    if value < 0.0 or value > 1.0:
+        raise ValueError("Уровень агрессии должен быть между 0.0 и 1.0")
+    relations[attacker, target] = value
+
@@ -1,16 +1,45 @@
 from __future__ import annotations
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+import lzma
+import os
+import pickle
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 from tcod.console import Console
 
 from entity import Actor, Item
+from pathfinding import RegionGraph, label_regions, same_region
 import tile_types
 
 if TYPE_CHECKING:
+    from camera import Camera
     from engine import Engine
     from entity import Entity
+    from procgen import GenerationReport
+
+# Maps from this size up use the region graph for long paths.
+REGION_GRAPH_MIN_AREA = 200 * 200
+
+# Первые этажи подземелья - комнаты и коридоры, глубже - пещеры.
+DEFAULT_FLOOR_LAYOUTS = {2: "rooms", 3: "rooms"}
+
+# Layers which attach_storage moves into memory-mapped files.
+MAPPED_LAYERS = ("tiles", "explored")
+
+# The map is processed in square chunks. Only the chunks within
+# ACTIVE_CHUNK_RADIUS of the player's chunk get FOV and enemy turns.
+CHUNK_SIZE = 32
+ACTIVE_CHUNK_RADIUS = 2
+
+
+def delete_layer_files(prefix: str) -> None:
+    """Remove the memory-mapped layer files written under prefix by attach_storage."""
+    for layer in MAPPED_LAYERS:
+        try:
+            os.remove(f"{prefix}.{layer}.npy")
+        except OSError:
+            pass  # Still mapped on Windows, the file is left behind.
 
 
 class GameMap:
@@ -20,7 +49,11 @@ class GameMap:
         self.engine = engine
         self.width, self.height = width, height
         self.entities = set(entities)
-        self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
+        # Path prefix of the memory-mapped layer files, None keeps them in memory.
+        self.storage: Optional[str] = None
+        self.tiles = np.full(
+            (width, height), fill_value=tile_types.wall, dtype=tile_types.tile_id_dt, order="F"
+        )
 
         self.visible = np.full(
             (width, height), fill_value=False, order="F"
@@ -29,12 +62,106 @@ class GameMap:
             (width, height), fill_value=False, order="F"
         )  # Tiles the player has seen before
         self.known = np.full((width, height), fill_value=False, order="F")
+        # Area of the last FOV update, nothing outside it is visible.
+        self.fov_area: Tuple[slice, slice] = (slice(0, 0), slice(0, 0))
         self.downstairs_locations = []
+        # Cluster graph for long paths, built once the floor is generated.
+        self.region_graph: Optional[RegionGraph] = None
+        # Stage timings and counters of the generator which built this map.
+        self.generation_report: Optional[GenerationReport] = None
 
     @property
     def gamemap(self) -> GameMap:
         return self
 
+    @property
+    def tiles(self) -> np.ndarray:
+        """Tile IDs of the map.
+
+        Change single tiles with set_tile or set_tiles, writing into this array
+        directly leaves the walkable and transparent masks out of date.
+        """
+        return self._tiles
+
+    @tiles.setter
+    def tiles(self, tiles: np.ndarray) -> None:
+        if self.storage is not None and tiles is not self._tiles:
+            self._tiles[...] = tiles  # Keep writing into the mapped file.
+        else:
+            self._tiles = tiles
+        self.update_masks()
+
+    def update_masks(self) -> None:
+        # Contiguous masks, FOV and the pathfinders use them without converting.
+        self.walkable = np.ascontiguousarray(tile_types.WALKABLE[self._tiles])
+        self.transparent = np.ascontiguousarray(tile_types.TRANSPARENT[self._tiles])
+        self._region_labels: Optional[np.ndarray] = None
+
+    def layer_path(self, layer: str) -> str:
+        return f"{self.storage}.{layer}.npy"
+
+    def attach_storage(self, prefix: str) -> None:
+        """
+        Move the tiles and explored layers into memory-mapped .npy files.
+
+        The files are named <prefix>.tiles.npy and <prefix>.explored.npy. The OS
+        pages them in as they are used, and a saved game only flushes them
+        instead of pickling the arrays.
+        """
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        self.storage = prefix
+        for layer, data in (("tiles", self._tiles), ("explored", self.explored)):
+            mapped = np.lib.format.open_memmap(
+                self.layer_path(layer),
+                mode="w+",
+                dtype=data.dtype,
+                shape=data.shape,
+                fortran_order=True,
+            )
+            mapped[...] = data
+            if layer == "tiles":
+                self._tiles = mapped
+            else:
+                self.explored = mapped
+
+    def flush(self) -> None:
+        """Write the memory-mapped layers to their files."""
+        if self.storage is not None:
+            self._tiles.flush()
+            self.explored.flush()
+
+    def delete_storage(self) -> None:
+        """Remove the layer files of a map which is no longer used."""
+        if self.storage is not None:
+            delete_layer_files(self.storage)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        if self.storage is not None:
+            # The layers are in their files, the masks are rebuilt from the tiles.
+            for key in ("_tiles", "explored", "walkable", "transparent"):
+                del state[key]
+            state["_region_labels"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        old_save = "tiles" in state
+        if old_save:
+            # Сохранения до ID тайлов: записи tile_dt, без масок и файлов слоёв
+            state["_tiles"] = tile_types.tile_ids(state.pop("tiles"))
+            state.setdefault("storage", None)
+            state.setdefault("fov_area", (slice(None), slice(None)))
+            state.setdefault("region_graph", None)
+            state.setdefault("generation_report", None)
+        self.__dict__.update(state)
+        if self.storage is not None:
+            self._tiles = np.load(self.layer_path("tiles"), mmap_mode="r+")
+            self.explored = np.load(self.layer_path("explored"), mmap_mode="r+")
+            self.update_masks()
+        elif old_save:
+            self.update_masks()
+            self.build_region_graph()
+
     @property
     def actors(self) -> Iterator[Actor]:
         """Iterate over this maps living actors."""
@@ -68,21 +195,120 @@ class GameMap:
 
         return None
 
+    def set_tile(self, x: int, y: int, tile: int) -> None:
+        """Change a single tile, keeping the masks and the region graph up to date."""
+        walkable = tile_types.WALKABLE[tile]
+        if self.walkable[x, y] != walkable:
+            self.update_region_labels(x, y, walkable)
+        self._tiles[x, y] = tile
+        self.walkable[x, y] = walkable
+        self.transparent[x, y] = tile_types.TRANSPARENT[tile]
+        if self.region_graph is not None:
+            self.region_graph.mark_dirty(x, y)
+
+    def set_tiles(self, index: Any, tile: int) -> None:
+        """Change a block of tiles, index is a pair of slices or a boolean mask."""
+        self._tiles[index] = tile
+        self.walkable[index] = tile_types.WALKABLE[tile]
+        self.transparent[index] = tile_types.TRANSPARENT[tile]
+        self._region_labels = None
+        if self.region_graph is not None:
+            changed = np.zeros(self._tiles.shape, dtype=bool)
+            changed[index] = True
+            self.region_graph.mark_dirty_area(changed)
+
+    @property
+    def region_labels(self) -> np.ndarray:
+        """Connected area label of every cell, see pathfinding.label_regions."""
+        if self._region_labels is None:
+            self._region_labels = label_regions(self.walkable)
+        return self._region_labels
+
+    def update_region_labels(self, x: int, y: int, walkable: bool) -> None:
+        """Keep the labels valid when the walkability of x, y changes."""
+        labels = self._region_labels
+        if labels is None:
+            return
+        if not walkable:
+            # The cell may have split its area, label again when asked.
+            self._region_labels = None
+            return
+        around = labels[max(0, x - 1) : x + 2, max(0, y - 1) : y + 2]
+        neighbors = np.unique(around[around > 0])
+        if neighbors.size == 0:
+            labels[x, y] = labels.max() + 1
+        else:
+            # The new cell joins every area around it into one.
+            labels[np.isin(labels, neighbors[1:])] = neighbors[0]
+            labels[x, y] = neighbors[0]
+
+    def same_region(self, a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+        """Return True if a walker can get from a to b, ignoring entities."""
+        return same_region(self.region_labels, a, b)
+
+    def build_region_graph(self) -> None:
+        # On small maps a direct search is cheaper than keeping the graph.
+        if self.width * self.height >= REGION_GRAPH_MIN_AREA:
+            self.region_graph = RegionGraph(self.walkable)
+
+    def get_region_graph(self) -> Optional[RegionGraph]:
+        """Return the region graph, applying any tile changes made since last time."""
+        if self.region_graph is not None:
+            self.region_graph.refresh(self.walkable)
+        return self.region_graph
+
+    def get_path_cost(self) -> np.ndarray:
+        """Return the pathfinding cost array for the current state of the map."""
+        # Copy the walkable array.
+        cost = self.walkable.astype(np.int8)
+
+        for entity in self.entities:
+            # Check that an enitiy blocks movement and the cost isn't zero (blocking.)
+            if entity.blocks_movement and cost[entity.x, entity.y]:
+                # Add to the cost of a blocked position.
+                # A lower number means more enemies will crowd behind each other in
+                # hallways.  A higher number means enemies will take longer paths in
+                # order to surround the player.
+                cost[entity.x, entity.y] += 10
+
+        return cost
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def render(self, console: Console) -> None:
+    def active_area(self, x: int, y: int) -> Tuple[slice, slice]:
+        """Return the slices covering the active chunks around x, y."""
+        chunk_x, chunk_y = x // CHUNK_SIZE, y // CHUNK_SIZE
+        return (
+            slice(
+                max(0, (chunk_x - ACTIVE_CHUNK_RADIUS) * CHUNK_SIZE),
+                min(self.width, (chunk_x + ACTIVE_CHUNK_RADIUS + 1) * CHUNK_SIZE),
+            ),
+            slice(
+                max(0, (chunk_y - ACTIVE_CHUNK_RADIUS) * CHUNK_SIZE),
+                min(self.height, (chunk_y + ACTIVE_CHUNK_RADIUS + 1) * CHUNK_SIZE),
+            ),
+        )
+
+    @staticmethod
+    def in_area(area: Tuple[slice, slice], x: int, y: int) -> bool:
+        return area[0].start <= x < area[0].stop and area[1].start <= y < area[1].stop
+
+    def render(self, console: Console, camera: Camera) -> None:
         """
-        Renders the map.
+        Renders the part of the map inside the camera window.
 
         If a tile is in the "visible" array, then draw it with the "light" colors.
         If it isn't, but it's in the "explored" array, then draw it with the "dark" colors.
         Otherwise, the default is "SHROUD".
         """
-        console.tiles_rgb[0 : self.width, 0 : self.height] = np.select(
-            condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
+        view = camera.view(self)
+        tiles = self.tiles[view]
+        width, height = tiles.shape
+        console.tiles_rgb[0:width, 0:height] = np.select(
+            condlist=[self.visible[view], self.explored[view]],
+            choicelist=[tile_types.LIGHT[tiles], tile_types.DARK[tiles]],
             default=tile_types.SHROUD,
         )
 
@@ -91,10 +317,29 @@ class GameMap:
         )
 
         for entity in entities_sorted_for_rendering:
-            if self.visible[entity.x, entity.y]:
-                console.print(
-                    x=entity.x, y=entity.y, string=entity.char, fg=entity.color
-                )
+            if camera.in_view(entity.x, entity.y) and self.visible[entity.x, entity.y]:
+                x, y = camera.to_console(entity.x, entity.y)
+                console.print(x=x, y=y, string=entity.char, fg=entity.color)
+
+
+def pack_floor(game_map: GameMap) -> bytes:
+    """
+    Return a generated floor as compressed bytes, without its engine and player.
+
+    Used for floors generated in worker processes. The player's position is kept
+    as the start position, see unpack_floor.
+    """
+    player = game_map.engine.player
+    game_map.entities.discard(player)
+    game_map.engine = None
+    return lzma.compress(pickle.dumps((game_map, (player.x, player.y))))
+
+
+def unpack_floor(data: bytes, engine: Engine) -> Tuple[GameMap, Tuple[int, int]]:
+    """Return the GameMap packed by pack_floor, attached to engine, and the player's start position."""
+    game_map, player_start = pickle.loads(lzma.decompress(data))
+    game_map.engine = engine
+    return game_map, player_start
 
 
 class GameWorld:
@@ -112,6 +357,10 @@ class GameWorld:
         room_min_size: int,
         room_max_size: int,
         current_floor: int = 0,
+        seed: Optional[int] = None,
+        dungeon_layout: str = "caves",
+        floor_layouts: Optional[Dict[int, str]] = None,
+        city_map: str = "city",
     ):
         self.engine = engine
 
@@ -125,12 +374,62 @@ class GameWorld:
 
         self.current_floor = current_floor
 
+        # World seed, every floor gets its own seed derived from it.
+        self.seed = seed
+        # Base map of the dungeon floors, see procgen.generate_dungeon.
+        self.dungeon_layout = dungeon_layout
+        # Layouts for single floors, overriding dungeon_layout. Besides "caves"
+        # and "rooms" a layout can name any map in assets/maps.
+        self.floor_layouts = (
+            dict(DEFAULT_FLOOR_LAYOUTS) if floor_layouts is None else floor_layouts
+        )
+        # Map in assets/maps the city is built on.
+        self.city_map = city_map
+        # Counts generated maps, so every map gets its own layer files.
+        self.maps_generated = 0
+        # Layer files of the map in the last save, and of left maps which can
+        # only go once a newer save replaces it.
+        self.saved_storage: Optional[str] = None
+        self.stale_storage: List[str] = []
+        # Floors generated ahead of time, from pack_floor, by floor number.
+        self.packed_floors: Dict[int, bytes] = {}
+
+    def __setstate__(self, state: dict) -> None:
+        # Сохранения старых версий не знают о сидах, раскладках и файлах слоёв
+        state.setdefault("seed", None)
+        state.setdefault("dungeon_layout", "caves")
+        state.setdefault("floor_layouts", dict(DEFAULT_FLOOR_LAYOUTS))
+        state.setdefault("city_map", "city")
+        state.setdefault("maps_generated", 0)
+        state.setdefault("saved_storage", None)
+        state.setdefault("stale_storage", [])
+        state.setdefault("packed_floors", {})
+        self.__dict__.update(state)
+
+    def floor_seed(self) -> Optional[int]:
+        """Return the seed of the current floor, None without a world seed."""
+        if self.seed is None:
+            return None
+        return int(np.random.SeedSequence([self.seed, self.current_floor]).generate_state(1)[0])
+
+    def layout_for_floor(self, floor: int) -> str:
+        return self.floor_layouts.get(floor, self.dungeon_layout)
+
     def generate_floor(self) -> None:
-        from procgen import generate_dungeon, generate_city
+        from procgen import generate_dungeon, generate_city, party_members, place_party
 
         self.current_floor += 1
+        old_map = getattr(self.engine, "game_map", None)
+        packed = self.packed_floors.pop(self.current_floor, None)
 
-        if self.current_floor == 1:
+        if packed is not None:
+            # Этаж уже сгенерирован заранее, осталось перенести игрока и отряд
+            game_map, (player_x, player_y) = unpack_floor(packed, self.engine)
+            self.engine.player.place(player_x, player_y, game_map)
+            if old_map is not None:
+                place_party(game_map, player_x, player_y, party_members(old_map))
+            self.engine.game_map = game_map
+        elif self.current_floor == 1:
             # Первый этаж - город
             self.engine.game_map = generate_city(
                 max_rooms=self.max_rooms,
@@ -139,6 +438,7 @@ class GameWorld:
                 map_width=self.map_width,
                 map_height=self.map_height,
                 engine=self.engine,
+                map_name=self.city_map,
             )
         else:
             # Остальные этажи - подземелья
@@ -149,4 +449,29 @@ class GameWorld:
                 map_width=self.map_width,
                 map_height=self.map_height,
                 engine=self.engine,
+                layout=self.layout_for_floor(self.current_floor),
+                seed=self.floor_seed(),
+            )
+
+        storage_dir = self.engine.map_storage_dir
+        if storage_dir is not None:
+            self.maps_generated += 1
+            self.engine.game_map.attach_storage(
+                os.path.join(storage_dir, f"map_{self.maps_generated}")
             )
+            if old_map is not None and old_map.storage is not None:
+                if old_map.storage == self.saved_storage:
+                    # Последнее сохранение ещё ссылается на эти файлы
+                    self.stale_storage.append(old_map.storage)
+                else:
+                    old_map.delete_storage()
+
+    def storage_saved(self) -> None:
+        """
+        Remove the layer files which only older saves used.
+
+        Called by Engine.save_as once the new save is written.
+        """
+        for prefix in self.stale_storage:
+            delete_layer_files(prefix)
+        self.stale_storage = []
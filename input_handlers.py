@@ -155,8 +155,11 @@ class EventHandler(BaseEventHandler):
         return True
 
     def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
-        if self.engine.game_map.in_bounds(event.tile.x, event.tile.y):
-            self.engine.mouse_location = event.tile.x, event.tile.y
+        if not self.engine.camera.on_screen(event.tile.x, event.tile.y):
+            return  # The cursor is over the HUD, not the map.
+        x, y = self.engine.camera.to_map(event.tile.x, event.tile.y)
+        if self.engine.game_map.in_bounds(x, y):
+            self.engine.mouse_location = x, y
 
     def on_render(self, console: tcod.Console) -> None:
         self.engine.render(console)
@@ -198,7 +201,7 @@ class CharacterScreenEventHandler(AskUserEventHandler):
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console)
 
-        if self.engine.player.x <= 30:
+        if self.engine.camera.to_console(self.engine.player.x, self.engine.player.y)[0] <= 30:
             x = 40
         else:
             x = 0
@@ -247,7 +250,7 @@ class LevelUpEventHandler(AskUserEventHandler):
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console)
 
-        if self.engine.player.x <= 30:
+        if self.engine.camera.to_console(self.engine.player.x, self.engine.player.y)[0] <= 30:
             x = 40
         else:
             x = 0
@@ -338,7 +341,7 @@ class InventoryEventHandler(AskUserEventHandler):
         if height <= 3:
             height = 3
 
-        if self.engine.player.x <= 30:
+        if self.engine.camera.to_console(self.engine.player.x, self.engine.player.y)[0] <= 30:
             x = 40
         else:
             x = 0
@@ -429,7 +432,9 @@ class SelectIndexHandler(AskUserEventHandler):
     def on_render(self, console: tcod.Console) -> None:
         """Highlight the tile under the cursor."""
         super().on_render(console)
-        x, y = self.engine.mouse_location
+        if not self.engine.camera.in_view(*self.engine.mouse_location):
+            return
+        x, y = self.engine.camera.to_console(*self.engine.mouse_location)
         console.tiles_rgb["bg"][x, y] = color.white
         console.tiles_rgb["fg"][x, y] = color.black
 
@@ -462,9 +467,10 @@ class SelectIndexHandler(AskUserEventHandler):
         self, event: tcod.event.MouseButtonDown
     ) -> Optional[ActionOrHandler]:
         """Left click confirms a selection."""
-        if self.engine.game_map.in_bounds(*event.tile):
+        x, y = self.engine.camera.to_map(*event.tile)
+        if self.engine.camera.on_screen(*event.tile) and self.engine.game_map.in_bounds(x, y):
             if event.button == 1:
-                return self.on_index_selected(*event.tile)
+                return self.on_index_selected(x, y)
         return super().ev_mousebuttondown(event)
 
     def on_index_selected(self, x: int, y: int) -> Optional[ActionOrHandler]:
@@ -511,8 +517,10 @@ class AreaRangedAttackHandler(SelectIndexHandler):
     def on_render(self, console: tcod.Console) -> None:
         """Highlight the tile under the cursor."""
         super().on_render(console)
+        if not self.engine.camera.in_view(*self.engine.mouse_location):
+            return
 
-        x, y = self.engine.mouse_location
+        x, y = self.engine.camera.to_console(*self.engine.mouse_location)
 
         # Draw a rectangle around the targeted area, so the player can see the affected tiles.
         console.draw_frame(
@@ -0,0 +1,323 @@
+"""
+Hierarchical pathfinding for long paths, in the style of HPA*.
+
+The map is cut into square clusters. Every walkable stretch of a cluster border
+becomes an entrance, a pair of nodes facing each other across the border. Nodes
+in the same cluster are linked by their walking distance inside that cluster.
+A long path is first planned on this small graph and then refined leg by leg
+with the regular pathfinder, each leg only looking at one cluster.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Iterator, List, Set, Tuple
+
+import numpy as np  # type: ignore
+import tcod
+
+Position = Tuple[int, int]
+Cluster = Tuple[int, int]
+
+# Same step costs as the regular pathfinder.
+CARDINAL = 2
+DIAGONAL = 3
+
+
+def label_regions(walkable: np.ndarray) -> np.ndarray:
+    """Label the connected areas of walkable cells, diagonal steps included.
+
+    Returns an int32 array of the same shape, 0 for cells which are not walkable
+    and the same positive label for cells which can reach each other.
+    """
+    width, height = walkable.shape
+    labels = np.zeros(walkable.shape, dtype=np.int32)
+    if not walkable.any():
+        return labels
+
+    # Cells in one vertical run are always connected, so the runs are the nodes.
+    run_starts = walkable.copy()
+    run_starts[:, 1:] &= ~walkable[:, :-1]
+    run_id = np.cumsum(run_starts.ravel()).reshape(walkable.shape) - 1
+    runs = int(run_id[-1, -1]) + 1
+
+    # Runs touching in the next column, straight or diagonally.
+    starts = []
+    ends = []
+    for dy in (0, 1, -1):
+        a = (slice(0, width - 1), slice(max(0, -dy), height - max(0, dy)))
+        b = (slice(1, width), slice(max(0, dy), height - max(0, -dy)))
+        both = walkable[a] & walkable[b]
+        starts.append(run_id[a][both])
+        ends.append(run_id[b][both])
+    start = np.concatenate(starts)
+    end = np.concatenate(ends)
+    # Long runs side by side list the same pair many times in a row.
+    keep = np.ones(start.size, dtype=bool)
+    keep[1:] = (start[1:] != start[:-1]) | (end[1:] != end[:-1])
+    start = start[keep]
+    end = end[keep]
+
+    # Union-find on arrays: hook the higher root of every pair onto the lower
+    # one, then jump pointers until every run points at its root.
+    parent = np.arange(runs)
+    while True:
+        root_a = parent[start]
+        root_b = parent[end]
+        merge = root_a != root_b
+        if not merge.any():
+            break
+        np.minimum.at(
+            parent,
+            np.maximum(root_a[merge], root_b[merge]),
+            np.minimum(root_a[merge], root_b[merge]),
+        )
+        while True:
+            grandparent = parent[parent]
+            if (grandparent == parent).all():
+                break
+            parent = grandparent
+
+    _, region = np.unique(parent, return_inverse=True)
+    labels[walkable] = region.reshape(-1)[run_id[walkable]] + 1
+    return labels
+
+
+def same_region(labels: np.ndarray, a: Position, b: Position) -> bool:
+    """Return True if a walker can get from a to b by the labels of label_regions."""
+    return bool(labels[a] != 0 and labels[a] == labels[b])
+
+
+class RegionGraph:
+    def __init__(self, walkable: np.ndarray, cluster_size: int = 16):
+        self.width, self.height = walkable.shape
+        self.cluster_size = cluster_size
+        # Paths shorter than this are cheaper to find directly.
+        self.long_path_distance = cluster_size * 2
+
+        self.clusters_x = -(-self.width // cluster_size)
+        self.clusters_y = -(-self.height // cluster_size)
+        # Entrance pairs for each border, keyed by the two clusters it separates.
+        self.borders: Dict[Tuple[Cluster, Cluster], List[Tuple[Position, Position]]] = {}
+        self.cluster_nodes: Dict[Cluster, Set[Position]] = {}
+        self.inter: Dict[Position, Dict[Position, int]] = {}
+        self.intra: Dict[Position, Dict[Position, int]] = {}
+        self.dirty: Set[Cluster] = set()
+
+        for cluster in self.clusters():
+            for neighbor in self.border_neighbors(cluster):
+                self.build_border(walkable, cluster, neighbor)
+        for cluster in self.clusters():
+            self.build_cluster(walkable, cluster)
+
+    def clusters(self) -> Iterator[Cluster]:
+        for cx in range(self.clusters_x):
+            for cy in range(self.clusters_y):
+                yield cx, cy
+
+    def border_neighbors(self, cluster: Cluster) -> Iterator[Cluster]:
+        """Clusters to the right and below, so every border is visited once."""
+        cx, cy = cluster
+        if cx + 1 < self.clusters_x:
+            yield cx + 1, cy
+        if cy + 1 < self.clusters_y:
+            yield cx, cy + 1
+
+    def adjacent_clusters(self, cluster: Cluster) -> Iterator[Cluster]:
+        cx, cy = cluster
+        for nx, ny in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+            if 0 <= nx < self.clusters_x and 0 <= ny < self.clusters_y:
+                yield nx, ny
+
+    def cluster_of(self, x: int, y: int) -> Cluster:
+        return x // self.cluster_size, y // self.cluster_size
+
+    def bounds(self, cluster: Cluster) -> Tuple[slice, slice]:
+        cx, cy = cluster
+        size = self.cluster_size
+        return (
+            slice(cx * size, min((cx + 1) * size, self.width)),
+            slice(cy * size, min((cy + 1) * size, self.height)),
+        )
+
+    def build_border(self, walkable: np.ndarray, a: Cluster, b: Cluster) -> None:
+        """Find the entrances on the border between clusters a and b."""
+        for pos_a, pos_b in self.borders.pop((a, b), []):
+            self.inter[pos_a].pop(pos_b, None)
+            self.inter[pos_b].pop(pos_a, None)
+
+        size = self.cluster_size
+        if a[0] != b[0]:  # b is to the right of a.
+            x = b[0] * size
+            span = self.bounds(a)[1]
+            open_cells = walkable[x - 1, span] & walkable[x, span]
+            to_pos = lambda i: ((x - 1, span.start + i), (x, span.start + i))
+        else:  # b is below a.
+            y = b[1] * size
+            span = self.bounds(a)[0]
+            open_cells = walkable[span, y - 1] & walkable[span, y]
+            to_pos = lambda i: ((span.start + i, y - 1), (span.start + i, y))
+
+        # One entrance in the middle of every open stretch of the border.
+        edges = np.diff(np.concatenate(([0], open_cells.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        entrances = [to_pos(int((start + end - 1) // 2)) for start, end in zip(starts, ends)]
+        self.borders[(a, b)] = entrances
+        for pos_a, pos_b in entrances:
+            self.inter.setdefault(pos_a, {})[pos_b] = CARDINAL
+            self.inter.setdefault(pos_b, {})[pos_a] = CARDINAL
+
+    def build_cluster(self, walkable: np.ndarray, cluster: Cluster) -> None:
+        """Collect the nodes of a cluster and link them by walking distance."""
+        nodes: Set[Position] = set()
+        for neighbor in self.adjacent_clusters(cluster):
+            if neighbor > cluster:
+                nodes.update(pos for pos, _ in self.borders[(cluster, neighbor)])
+            else:
+                nodes.update(pos for _, pos in self.borders[(neighbor, cluster)])
+
+        for node in self.cluster_nodes.get(cluster, ()):
+            self.intra.pop(node, None)
+        self.cluster_nodes[cluster] = nodes
+
+        for node in nodes:
+            self.intra[node] = self.distances_in_cluster(walkable, node, nodes)
+
+    def distances_in_cluster(
+        self, walkable: np.ndarray, origin: Position, targets: Set[Position]
+    ) -> Dict[Position, int]:
+        """Walking distance from origin to each reachable target in its cluster."""
+        x_slice, y_slice = self.bounds(self.cluster_of(*origin))
+        cost = walkable[x_slice, y_slice].astype(np.int8)
+        dist = tcod.path.maxarray(cost.shape, dtype=np.int32)
+        dist[origin[0] - x_slice.start, origin[1] - y_slice.start] = 0
+        tcod.path.dijkstra2d(dist, cost, CARDINAL, DIAGONAL, out=dist)
+        unreachable = np.iinfo(np.int32).max
+        result = {}
+        for target in targets:
+            if target == origin:
+                continue
+            value = int(dist[target[0] - x_slice.start, target[1] - y_slice.start])
+            if value != unreachable:
+                result[target] = value
+        return result
+
+    def mark_dirty(self, x: int, y: int) -> None:
+        """Note that the tile at (x, y) changed, it's rebuilt on the next refresh."""
+        self.dirty.add(self.cluster_of(x, y))
+
+    def mark_dirty_area(self, changed: np.ndarray) -> None:
+        """Same as mark_dirty for every cell set in the boolean array changed."""
+        xs, ys = np.nonzero(changed)
+        clusters = np.unique(
+            np.stack((xs // self.cluster_size, ys // self.cluster_size), axis=1), axis=0
+        )
+        self.dirty.update((int(cx), int(cy)) for cx, cy in clusters)
+
+    def refresh(self, walkable: np.ndarray) -> None:
+        """Rebuild the borders and links of every cluster touched since last time."""
+        if not self.dirty:
+            return
+        rebuild: Set[Cluster] = set()
+        for cluster in self.dirty:
+            for neighbor in self.adjacent_clusters(cluster):
+                a, b = min(cluster, neighbor), max(cluster, neighbor)
+                self.build_border(walkable, a, b)
+                rebuild.add(neighbor)
+            rebuild.add(cluster)
+        for cluster in rebuild:
+            self.build_cluster(walkable, cluster)
+        self.dirty.clear()
+
+    def find_path(
+        self, cost: np.ndarray, start: Position, dest: Position
+    ) -> List[Position]:
+        """Plan on the cluster graph, then refine it into a full path.
+
+        Returns an empty list if the graph has no route, the caller should then
+        fall back to the regular pathfinder.
+        """
+        walkable = cost > 0
+        start_cluster = self.cluster_of(*start)
+        dest_cluster = self.cluster_of(*dest)
+        start_targets = set(self.cluster_nodes[start_cluster])
+        if start_cluster == dest_cluster:
+            start_targets.add(dest)
+        start_links = self.distances_in_cluster(walkable, start, start_targets)
+        # Distances are symmetric, so the links into dest are found from dest.
+        dest_links = self.distances_in_cluster(walkable, dest, self.cluster_nodes[dest_cluster])
+
+        waypoints = self.search(start, dest, start_links, dest_links)
+        if not waypoints:
+            return []
+
+        path: List[Position] = []
+        position = start
+        for waypoint in waypoints:
+            if max(abs(waypoint[0] - position[0]), abs(waypoint[1] - position[1])) == 1:
+                path.append(waypoint)  # A step across a border.
+            else:
+                leg = self.refine(cost, position, waypoint)
+                if not leg:
+                    return []
+                path.extend(leg)
+            position = waypoint
+        return path
+
+    def search(
+        self,
+        start: Position,
+        dest: Position,
+        start_links: Dict[Position, int],
+        dest_links: Dict[Position, int],
+    ) -> List[Position]:
+        """A* over the cluster graph, returns the waypoints after start."""
+        dest_x, dest_y = dest
+        frontier = [(0, 0, start)]
+        came_from: Dict[Position, Position] = {}
+        best = {start: 0}
+        no_links: Dict[Position, int] = {}
+        while frontier:
+            _, distance, node = heapq.heappop(frontier)
+            if node == dest:
+                waypoints = []
+                while node != start:
+                    waypoints.append(node)
+                    node = came_from[node]
+                return waypoints[::-1]
+            if distance > best[node]:
+                continue
+            if node == start:
+                link_groups = (start_links,)
+            else:
+                link_groups = (
+                    self.intra.get(node, no_links),
+                    self.inter.get(node, no_links),
+                    {dest: dest_links[node]} if node in dest_links else no_links,
+                )
+            for links in link_groups:
+                for neighbor, step in links.items():
+                    new_distance = distance + step
+                    if new_distance >= best.get(neighbor, new_distance + 1):
+                        continue
+                    best[neighbor] = new_distance
+                    came_from[neighbor] = node
+                    # Octile distance to dest as the heuristic.
+                    dx = abs(neighbor[0] - dest_x)
+                    dy = abs(neighbor[1] - dest_y)
+                    if dx < dy:
+                        dx, dy = dy, dx
+                    estimate = new_distance + CARDINAL * dx + (DIAGONAL - CARDINAL) * dy
+                    heapq.heappush(frontier, (estimate, new_distance, neighbor))
+        return []
+
+    def refine(self, cost: np.ndarray, start: Position, dest: Position) -> List[Position]:
+        """Path from start to dest inside the cluster they share."""
+        x_slice, y_slice = self.bounds(self.cluster_of(*start))
+        graph = tcod.path.SimpleGraph(
+            cost=cost[x_slice, y_slice], cardinal=CARDINAL, diagonal=DIAGONAL
+        )
+        pathfinder = tcod.path.Pathfinder(graph)
+        pathfinder.add_root((start[0] - x_slice.start, start[1] - y_slice.start))
+        leg = pathfinder.path_to((dest[0] - x_slice.start, dest[1] - y_slice.start))[1:]
+        return [(int(x) + x_slice.start, int(y) + y_slice.start) for x, y in leg]
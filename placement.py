@@ -0,0 +1,303 @@
+"""
+Placement of multi-cell shapes on a mask of free cells.
+
+A footprint is an (n, 2) array of (dx, dy) offsets from its anchor cell. All
+valid anchors of a footprint are found in one pass over the map: the number of
+blocked cells under the footprint at every anchor is a box sum for rectangles,
+read from a summed-area table, and a correlation of the blocked mask with the
+footprint for other shapes. An anchor is valid where that number is zero.
+RectAnchors keeps those anchors while a free mask fills up, clearing only the
+anchors next to each box taken out of it.
+
+Single features such as stairs are placed by rank instead: walk_distance gives
+the walking distance from a point to every cell in one Dijkstra pass, and
+pick_far picks among the cells with the highest score. Actors placed around a
+point take the nearest free cells found by a breadth-first search, and spawns
+are spread over the map by budget_cells, or one whole spawn at a time with
+pick_sector and box_anchors.
+"""
+from __future__ import annotations
+
+from collections import deque
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+import tcod
+
+
+def rect_footprint(width: int, height: int) -> np.ndarray:
+    """Return the footprint of a width x height rectangle anchored at its top left cell."""
+    xs, ys = np.mgrid[0:width, 0:height]
+    return np.stack([xs.ravel(), ys.ravel()], axis=1).astype(np.intp)
+
+
+def rect_blocked(free: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Return the number of blocked cells under a width x height rectangle at every anchor.
+
+    The result has one entry per anchor which keeps the rectangle on the map,
+    and is empty when the rectangle is larger than the map.
+    """
+    map_width, map_height = free.shape
+    if width > map_width or height > map_height:
+        return np.zeros((0, 0), dtype=np.int32)
+    table = np.zeros((map_width + 1, map_height + 1), dtype=np.int32)
+    table[1:, 1:] = (~free).cumsum(axis=0, dtype=np.int32).cumsum(axis=1)
+    return (
+        table[width:, height:]
+        - table[:-width, height:]
+        - table[width:, :-height]
+        + table[:-width, :-height]
+    )
+
+
+def rect_anchors(free: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Return every (x, y) where a width x height rectangle only covers free cells."""
+    return np.argwhere(rect_blocked(free, width, height) == 0)
+
+
+class RectAnchors:
+    """
+    Valid anchors of rectangles on a free mask which only ever loses free cells.
+
+    The anchors of every rectangle size are found once, with the summed-area
+    table of rect_blocked. Taking a box out of the mask can only spoil anchors
+    whose rectangle overlaps it, so occupy clears just that window for each size.
+    """
+
+    def __init__(self, free: np.ndarray):
+        self.free = free
+        self._valid: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def valid(self, width: int, height: int) -> np.ndarray:
+        """Return the mask of valid anchors of a width x height rectangle."""
+        key = (width, height)
+        if key not in self._valid:
+            self._valid[key] = rect_blocked(self.free, width, height) == 0
+        return self._valid[key]
+
+    def pick(self, width: int, height: int, tries: int = 16) -> Optional[Tuple[int, int]]:
+        """Return a random valid anchor of a width x height rectangle, or None."""
+        valid = self.valid(width, height)
+        if not valid.size:
+            return None
+        # Пока свободного места много, хватает нескольких случайных попыток
+        for _ in range(tries):
+            x = random.randrange(valid.shape[0])
+            y = random.randrange(valid.shape[1])
+            if valid[x, y]:
+                return x, y
+        return pick_anchor(np.argwhere(valid))
+
+    def occupy(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Take the cells x1 <= x < x2, y1 <= y < y2 out of the free mask."""
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), max(0, x2), max(0, y2)
+        if x1 >= x2 or y1 >= y2:
+            return
+        self.free[x1:x2, y1:y2] = False
+        for (width, height), valid in self._valid.items():
+            valid[max(0, x1 - width + 1) : x2, max(0, y1 - height + 1) : y2] = False
+
+
+def footprint_anchors(free: np.ndarray, footprint: np.ndarray) -> np.ndarray:
+    """Return every (x, y) where the footprint only covers free cells."""
+    map_width, map_height = free.shape
+    origin = footprint.min(axis=0)
+    width, height = footprint.max(axis=0) - origin + 1
+    if width > map_width or height > map_height:
+        return np.empty((0, 2), dtype=np.intp)
+    if len(np.unique(footprint, axis=0)) == width * height:
+        # Прямоугольник целиком - хватает суммы по окну
+        return rect_anchors(free, width, height) - origin
+    blocked_mask = (~free).astype(np.int32)
+    blocked = np.zeros((map_width - width + 1, map_height - height + 1), dtype=np.int32)
+    for dx, dy in footprint - origin:
+        blocked += blocked_mask[dx : dx + blocked.shape[0], dy : dy + blocked.shape[1]]
+    return np.argwhere(blocked == 0) - origin
+
+
+def box_anchors(free: np.ndarray, footprint: np.ndarray, xs: slice, ys: slice) -> np.ndarray:
+    """
+    Return every anchor inside the box xs, ys where the footprint only covers free cells.
+
+    Only the anchor has to be inside the box, the footprint may cover cells
+    around it. Just the box and the reach of the footprint are searched.
+    """
+    map_width, map_height = free.shape
+    low = np.minimum(footprint.min(axis=0), 0)
+    high = np.maximum(footprint.max(axis=0), 0)
+    x0, y0 = max(0, xs.start + low[0]), max(0, ys.start + low[1])
+    x1, y1 = min(map_width, xs.stop + high[0]), min(map_height, ys.stop + high[1])
+    anchors = footprint_anchors(free[x0:x1, y0:y1], footprint) + (x0, y0)
+    inside = (
+        (anchors[:, 0] >= xs.start) & (anchors[:, 0] < xs.stop)
+        & (anchors[:, 1] >= ys.start) & (anchors[:, 1] < ys.stop)
+    )
+    return anchors[inside]
+
+
+def fits(free: np.ndarray, footprint: np.ndarray, x: int, y: int) -> bool:
+    """Return True if the footprint anchored at x, y only covers free cells."""
+    xs = footprint[:, 0] + x
+    ys = footprint[:, 1] + y
+    width, height = free.shape
+    if xs.min() < 0 or ys.min() < 0 or xs.max() >= width or ys.max() >= height:
+        return False
+    return bool(free[xs, ys].all())
+
+
+def occupy(free: np.ndarray, footprint: np.ndarray, x: int, y: int) -> None:
+    """Take the cells of the footprint anchored at x, y out of the free mask."""
+    free[footprint[:, 0] + x, footprint[:, 1] + y] = False
+
+
+def pick_anchor(anchors: np.ndarray) -> Optional[Tuple[int, int]]:
+    """Return one of the anchors at random, or None if there are none."""
+    if not len(anchors):
+        return None
+    x, y = anchors[random.randrange(len(anchors))]
+    return int(x), int(y)
+
+
+def walk_distance(walkable: np.ndarray, start: Tuple[int, int]) -> np.ndarray:
+    """Return the walking distance of every cell from start, -1 where it can't be reached."""
+    distance = tcod.path.maxarray(walkable.shape, dtype=np.int32)
+    distance[start] = 0
+    tcod.path.dijkstra2d(distance, walkable.astype(np.int8), 1, 1, out=distance)
+    distance[distance == np.iinfo(np.int32).max] = -1
+    return distance
+
+
+def pick_far(
+    score: np.ndarray, candidates: np.ndarray, fraction: float = 0.1
+) -> Optional[Tuple[int, int]]:
+    """Return a random candidate cell among the given fraction with the highest score."""
+    cells = np.argwhere(candidates)
+    if not len(cells):
+        return None
+    values = score[candidates]
+    count = max(1, int(len(values) * fraction))
+    best = np.sort(np.argpartition(values, -count)[-count:])
+    x, y = cells[best[random.randrange(count)]]
+    return int(x), int(y)
+
+
+def nearest_free_cells(
+    walkable: np.ndarray, free: np.ndarray, start: Tuple[int, int], count: int
+) -> List[Tuple[int, int]]:
+    """
+    Return up to count free cells nearest to start by walking, nearest first.
+
+    The search walks over walkable cells, taken or not, and stops as soon as
+    count free cells are found. start itself is never returned.
+    """
+    width, height = walkable.shape
+    seen = np.zeros_like(walkable, dtype=bool)
+    seen[start] = True
+    queue = deque([start])
+    found: List[Tuple[int, int]] = []
+    while queue and len(found) < count:
+        x, y = queue.popleft()
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, -1), (-1, 1), (1, 1)):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height) or seen[nx, ny] or not walkable[nx, ny]:
+                continue
+            seen[nx, ny] = True
+            queue.append((nx, ny))
+            if free[nx, ny]:
+                found.append((nx, ny))
+                if len(found) == count:
+                    break
+    return found
+
+
+def sector_ids(shape: Tuple[int, int], sector_size: int) -> np.ndarray:
+    """Return the index of the sector_size square every cell of a map belongs to."""
+    sectors_y = -(-shape[1] // sector_size)
+    xs, ys = np.ogrid[: shape[0], : shape[1]]
+    return (xs // sector_size) * sectors_y + ys // sector_size
+
+
+def sector_box(shape: Tuple[int, int], sector_size: int, sector: int) -> Tuple[slice, slice]:
+    """Return the cells of a sector from sector_ids as a 2D array index."""
+    sectors_y = -(-shape[1] // sector_size)
+    sx, sy = divmod(sector, sectors_y)
+    return (
+        slice(sx * sector_size, min((sx + 1) * sector_size, shape[0])),
+        slice(sy * sector_size, min((sy + 1) * sector_size, shape[1])),
+    )
+
+
+def sector_capacity(mask: np.ndarray, sectors: np.ndarray, cells_per_spawn: int) -> np.ndarray:
+    """Return how many spawned cells every sector takes, one per cells_per_spawn of its cells in mask."""
+    return np.bincount(sectors[mask], minlength=int(sectors.max()) + 1) // cells_per_spawn
+
+
+def pick_sector(budget: np.ndarray, size: int, rng: np.random.Generator) -> Optional[int]:
+    """
+    Return a random sector with at least size cells of budget left, or None.
+
+    A sector is picked with a chance proportional to its remaining budget, so
+    the spawns of a floor spread over it whatever their size.
+    """
+    weights = np.where(budget >= size, budget, 0)
+    total = int(weights.sum())
+    if not total:
+        return None
+    return int(np.searchsorted(np.cumsum(weights), rng.integers(total), side="right"))
+
+
+def sector_budgets(
+    mask: np.ndarray, sectors: np.ndarray, count: int, cells_per_spawn: int
+) -> np.ndarray:
+    """
+    Split count spawns over the sectors by their cells in mask.
+
+    Every sector gets a share proportional to its area, but never more than one
+    spawn per cells_per_spawn of its cells, so no part of the map gets crowded.
+    Returns the budget of every sector, the total can be below count.
+    """
+    capacity = np.bincount(sectors[mask], minlength=int(sectors.max()) + 1)
+    limit = sector_capacity(mask, sectors, cells_per_spawn)
+    count = min(max(count, 0), int(limit.sum()))
+    if not count:
+        return np.zeros_like(limit)
+
+    # Доли секторов, остаток раздаём секторам с наибольшей дробной частью
+    share = count * capacity / capacity.sum()
+    budget = np.minimum(share.astype(np.intp), limit)
+    while budget.sum() < count:
+        has_room = budget < limit
+        remainder = np.where(has_room, share - budget, -np.inf)
+        extra = min(count - int(budget.sum()), int(np.count_nonzero(has_room)))
+        budget[np.argsort(-remainder, kind="stable")[:extra]] += 1
+    return budget
+
+
+def budget_cells(
+    mask: np.ndarray,
+    count: int,
+    sector_size: int,
+    cells_per_spawn: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Return up to count cells of mask, spread over square sectors by their area.
+
+    The sectors get their share from sector_budgets. The cells inside a sector
+    are random and the result is shuffled.
+    """
+    cells = np.argwhere(mask)
+    if not len(cells) or count <= 0:
+        return np.empty((0, 2), dtype=np.intp)
+    sectors = sector_ids(mask.shape, sector_size)
+    budget = sector_budgets(mask, sectors, count, cells_per_spawn)
+    sector = sectors[cells[:, 0], cells[:, 1]]
+
+    # Случайный порядок клеток внутри каждого сектора
+    order = np.lexsort((rng.random(len(cells)), sector))
+    sorted_sector = sector[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_sector, sorted_sector)
+    chosen = cells[order[rank < budget[sorted_sector]]]
+    return chosen[rng.permutation(len(chosen))]
@@ -1,20 +1,107 @@
 from __future__ import annotations
 
+import itertools
+import json
+import os
 import random
-from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING, Union
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING, Union
 import numpy as np 
 import tcod
 import copy
 import entity_factories
 from game_map import GameMap
+import maps
+import placement
+from pathfinding import label_regions
 import tile_types
-from entity_factories import MONSTER_GROUP_TEMPLATES
+from entity_factories import MONSTER_GROUPS
+from components.ai import MonsterGroup
 
 
 
 if TYPE_CHECKING:
     from engine import Engine
-    from entity import Entity
+    from entity import Actor, Entity
+
+
+# Монстры не появляются ближе этого числа шагов от игрока.
+SAFE_RADIUS = 8
+# Размер сектора карты для распределения монстров и предметов,
+# и сколько свободных клеток сектора приходится на одно место спавна.
+SPAWN_SECTOR_SIZE = 16
+FREE_CELLS_PER_SPAWN = 20
+# Одиночный монстр занимает одну клетку.
+SINGLE_FOOTPRINT = np.zeros((1, 2), dtype=np.intp)
+# Раскладки подземелья, которые строятся генератором, а не берутся из assets/maps.
+GENERATED_LAYOUTS = ("caves", "rooms")
+# Карта раскладки "asset".
+DEFAULT_DUNGEON_MAP = "dungeon_1_lvl"
+# Доля клеток пола пещеры, ставших красными порталами.
+CAVE_PORTAL_CHANCE = 0.0005
+# Сколько сидов подряд пробует generate_cave_tiles, пока не получит пол.
+CAVE_ATTEMPTS = 10
+# Сколько случайных клеток проверяет find_valid_position до выбора среди всего пола.
+POSITION_SAMPLES = 100
+
+# Путь к файлу, куда дописывается JSON-отчёт о каждом сгенерированном этаже.
+# Без него замеры времени по стадиям не ведутся.
+REPORT_FILE: Optional[str] = os.environ.get("PROCGEN_REPORT")
+
+
+class GenerationReport:
+    """
+    Time spent in each stage of a generator and counters of what it did.
+
+    The generators attach it to the map as GameMap.generation_report. A stage
+    lasts from the previous mark, or the creation of the report, to its own.
+    The dungeon stages are tiles, player, groups, monsters, items, stairs and
+    region_graph, the city ones tiles, buildings, player, npcs and region_graph.
+
+    Stages are only timed when timed is set, by default when REPORT_FILE is.
+    Counters are always kept.
+    """
+
+    def __init__(self, generator: str, timed: Optional[bool] = None, **info: Any):
+        self.generator = generator
+        self.info = info
+        self.timed = bool(REPORT_FILE) if timed is None else timed
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._last = self._start = time.perf_counter() if self.timed else 0.0
+
+    def mark(self, stage: str) -> None:
+        if not self.timed:
+            return
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    @property
+    def total(self) -> float:
+        return self._last - self._start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "generator": self.generator,
+            **self.info,
+            "total_ms": round(self.total * 1000, 3),
+            "stages_ms": {stage: round(elapsed * 1000, 3) for stage, elapsed in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def finish(self, game_map: GameMap) -> None:
+        """Attach the report to the map, and append it to REPORT_FILE if that is set."""
+        game_map.generation_report = self
+        if REPORT_FILE:
+            with open(REPORT_FILE, "a") as f:
+                f.write(self.to_json() + "\n")
 
 
 max_items_by_floor = [
@@ -57,76 +144,164 @@ def get_max_value_for_floor(
 
     return current_value
 
-def spawn_monster_group(group_name: str, gamemap: GameMap, start_x: int, start_y: int):
-    # Найти шаблон группы по имени
-    group_template = next((g for g in MONSTER_GROUP_TEMPLATES if g["name"] == group_name), None)
+def free_cells(gamemap: GameMap) -> np.ndarray:
+    """Return a mask of the walkable cells that no entity stands on."""
+    free = gamemap.walkable.copy()
+    for entity in gamemap.entities:
+        free[entity.x, entity.y] = False
+    return free
+
+
+def find_valid_position(gamemap: GameMap, report: GenerationReport) -> Tuple[int, int]:
+    """
+    Return a random floor cell of gamemap.
+
+    Random cells are tried first. After POSITION_SAMPLES misses the cell is
+    picked among all floor cells, and a map without floor raises ValueError.
+    """
+    for _ in range(POSITION_SAMPLES):
+        x = random.randint(1, gamemap.width - 2)
+        y = random.randint(1, gamemap.height - 2)
+        if gamemap.tiles[x, y] == tile_types.floor:
+            return x, y
+        report.count("rejected_positions")
+    cells = np.argwhere(gamemap.tiles == tile_types.floor)
+    if not len(cells):
+        raise ValueError(f"The {gamemap.width}x{gamemap.height} map has no floor to place the player on.")
+    x, y = cells[random.randrange(len(cells))]
+    return int(x), int(y)
+
+
+def party_members(gamemap: GameMap) -> List[Actor]:
+    """Return the actors of a map which follow the player, in a fixed order."""
+    members = [
+        entity for entity in gamemap.actors
+        if hasattr(entity, "ai") and hasattr(entity.ai, "in_party") and entity.ai.in_party
+    ]
+    return sorted(members, key=lambda actor: (actor.x, actor.y))
+
+
+def place_party(gamemap: GameMap, x: int, y: int, members: List[Actor]) -> None:
+    """
+    Move the party members onto gamemap, on the free cells nearest to x, y.
+
+    Cells are taken in walking order from x, y. If the player's area has no room
+    left the rest go to the nearest free cells anywhere, nobody is left behind.
+    """
+    if not members:
+        return
+    free = free_cells(gamemap)
+    cells = placement.nearest_free_cells(gamemap.walkable, free, (x, y), len(members))
+    if len(cells) < len(members):
+        for cell in cells:
+            free[cell] = False
+        rest = np.argwhere(free)
+        nearest = np.argsort(np.maximum(abs(rest[:, 0] - x), abs(rest[:, 1] - y)), kind="stable")
+        cells += [(int(cx), int(cy)) for cx, cy in rest[nearest[: len(members) - len(cells)]]]
+    for member, (member_x, member_y) in zip(members, cells):
+        member.place(member_x, member_y, gamemap)
+
+
+def spawn_monster_group(
+    group_name: str,
+    gamemap: GameMap,
+    start_x: int,
+    start_y: int,
+    free: Optional[np.ndarray] = None,
+) -> Optional[MonsterGroup]:
+    """
+    Spawn a group from MONSTER_GROUPS with its first member at start_x, start_y.
+
+    Nothing is spawned unless the whole footprint is on free cells. free is the
+    mask from free_cells, the spawned cells are taken out of it.
+    """
+    group_template = MONSTER_GROUPS.get(group_name)
     if not group_template:
         print(f"Group template '{group_name}' not found.")
-        return
+        return None
+    if free is None:
+        free = free_cells(gamemap)
+    if not placement.fits(free, group_template["footprint"], start_x, start_y):
+        return None
 
-    members = group_template["members"]
-    for i, member in enumerate(members):
-        # Определи координаты для каждого монстра
-        # Можно, например, размещать их по сетке рядом
-        offset_x = start_x + (i % 3)  # 3 монстра в ряд
-        offset_y = start_y + (i // 3)
-        
-        # Вызываем spawn у каждого монстра
-        member.spawn(gamemap, offset_x, offset_y)
+    group = MonsterGroup(group_name)
+    for member, offset in zip(group_template["members"], group_template["offsets"]):
+        x, y = start_x + offset[0], start_y + offset[1]
+        spawned = member.spawn(gamemap, x, y)
+        # Первый монстр ведёт группу, остальные держат строй относительно него
+        group.add_member(spawned, offset)
+    placement.occupy(free, group_template["footprint"], start_x, start_y)
+    return group
+
+
+class SpawnTable:
+    """
+    Weighted entries of one spawn table for one floor.
+
+    The cumulative weights are computed once, so drawing k entries is a single
+    random.choices call with a binary search per draw.
+    """
+
+    def __init__(self, weights: Dict[Union[Entity, str], int]):
+        self.entries = [entry for entry, weight in weights.items() if weight > 0]
+        self.cum_weights = list(itertools.accumulate(weight for weight in weights.values() if weight > 0))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def sample(self, k: int) -> List[Union[Entity, str]]:
+        if not self.entries:
+            return []
+        return random.choices(self.entries, cum_weights=self.cum_weights, k=k)
+
+
+# (id таблицы шансов, этаж) -> (таблица шансов, одиночные, группы)
+_spawn_tables: Dict[Tuple[int, int], Tuple[dict, SpawnTable, SpawnTable]] = {}
 
-def get_entities_at_random(
-    weighted_chances_by_floor: Dict[int, List[Tuple[Entity, int]]], # <-- Тип не меняется, но теперь вызывающая сторона фильтрует
-    number_of_entities: int,
-    floor: int,
-) -> List[Entity]:
-    entity_weighted_chances = {}
-    for key, values in weighted_chances_by_floor.items():
-        if key > floor:
-            break
-        else:
-            for value in values:
-                entity = value[0]
-                weighted_chance = value[1]
-                # Обновляем шанс, последний шанс в списке имеет приоритет
-                entity_weighted_chances[entity] = weighted_chance
 
-    entities = list(entity_weighted_chances.keys())
-    entity_weighted_chance_values = list(entity_weighted_chances.values())
+def get_spawn_tables(
+    weighted_chances_by_floor: Dict[int, List[Tuple[Union[Entity, str], int]]], floor: int
+) -> Tuple[SpawnTable, SpawnTable]:
+    """
+    Return the (singles, groups) tables of a floor, compiled on first use.
 
-    # --- НОВАЯ ПРОВЕРКА ---
-    if not entity_weighted_chance_values:
-        # Если список весов пуст, возвращаем пустой список монстров
-        return []
+    Group templates are given by name in the chance tables, everything else is a
+    single entity.
+    """
+    key = (id(weighted_chances_by_floor), floor)
+    compiled = _spawn_tables.get(key)
+    if compiled is None or compiled[0] is not weighted_chances_by_floor:
+        weights: Dict[Union[Entity, str], int] = {}
+        for key_floor, values in weighted_chances_by_floor.items():
+            if key_floor > floor:
+                break
+            for entity_or_group_name, weighted_chance in values:
+                # Обновляем шанс, последний шанс в списке имеет приоритет
+                weights[entity_or_group_name] = weighted_chance
+        singles = SpawnTable({entry: weight for entry, weight in weights.items() if not isinstance(entry, str)})
+        groups = SpawnTable({entry: weight for entry, weight in weights.items() if isinstance(entry, str)})
+        compiled = _spawn_tables[key] = (weighted_chances_by_floor, singles, groups)
+    return compiled[1], compiled[2]
 
-    # --- КОНЕЦ НОВОЙ ПРОВЕРКИ ---
 
-    chosen_entities = random.choices(entities, weights=entity_weighted_chance_values, k=number_of_entities)
-    return chosen_entities
+def get_entities_at_random(
+    weighted_chances_by_floor: Dict[int, List[Tuple[Entity, int]]],
+    number_of_entities: int,
+    floor: int,
+) -> List[Entity]:
+    """Return number_of_entities single entities drawn from the floor's table."""
+    singles, _ = get_spawn_tables(weighted_chances_by_floor, floor)
+    return singles.sample(number_of_entities)
 
 def get_group_at_random(weighted_chances_by_floor: Dict[int, List[Tuple[Union[Entity, str], int]]], floor: int) -> str | None:
     """
     Выбирает случайное имя группы монстров на основе весов для текущего этажа.
     Возвращает имя группы или None, если подходящей нет.
     """
-    group_weighted_chances = {}
-    for key, values in weighted_chances_by_floor.items():
-        if key > floor:
-            break
-        else:
-            for value in values:
-                entity_or_group_name, weighted_chance = value
-                # Проверяем, является ли это строкой (именем группы)
-                if isinstance(entity_or_group_name, str):
-                    group_weighted_chances[entity_or_group_name] = weighted_chance
-
-    groups = list(group_weighted_chances.keys())
-    group_weighted_chance_values = list(group_weighted_chances.values())
-
-    if not groups:
+    _, groups = get_spawn_tables(weighted_chances_by_floor, floor)
+    if not len(groups):
         return None
-
-    chosen_group = random.choices(groups, weights=group_weighted_chance_values, k=1)[0]
-    return chosen_group
+    return groups.sample(1)[0]
 
 
 class RectangularRoom:
@@ -201,6 +376,127 @@ def tunnel_between(
         yield x, y
 
 
+def tunnel_slices(
+    start: Tuple[int, int], end: Tuple[int, int], horizontal_first: bool
+) -> List[Tuple[slice, slice]]:
+    """Return the two legs of an L-shaped tunnel as 2D array indexes."""
+    x1, y1 = start
+    x2, y2 = end
+    corner_x, corner_y = (x2, y1) if horizontal_first else (x1, y2)
+    return [
+        (slice(min(x1, corner_x), max(x1, corner_x) + 1), slice(min(y1, corner_y), max(y1, corner_y) + 1)),
+        (slice(min(corner_x, x2), max(corner_x, x2) + 1), slice(min(corner_y, y2), max(corner_y, y2) + 1)),
+    ]
+
+
+def generate_room_tiles(
+    map_width: int,
+    map_height: int,
+    max_rooms: int,
+    room_min_size: int,
+    room_max_size: int,
+    seed: int,
+) -> Tuple[np.ndarray, List[RectangularRoom]]:
+    """
+    Return the tile IDs of a map of rooms joined by tunnels, and the rooms.
+
+    All candidate rooms are drawn at once and their overlaps are found with one
+    broadcast interval test; rooms are then accepted in order if they miss every
+    room accepted before them, up to max_rooms. Rooms and tunnels are carved
+    with slice assignments.
+    """
+    rng = np.random.default_rng(seed)
+    candidates = max_rooms * 4
+    widths = rng.integers(room_min_size, room_max_size + 1, candidates)
+    heights = rng.integers(room_min_size, room_max_size + 1, candidates)
+    # Комнаты, которые не помещаются на карту, отбрасываем
+    fits = (widths < map_width) & (heights < map_height)
+    widths, heights = widths[fits], heights[fits]
+    x1 = (rng.random(widths.size) * (map_width - widths)).astype(int)
+    y1 = (rng.random(heights.size) * (map_height - heights)).astype(int)
+    x2 = x1 + widths
+    y2 = y1 + heights
+
+    # overlaps[i, j] is the same test as RectangularRoom.intersects.
+    overlaps = (
+        (x1[:, None] <= x2[None, :])
+        & (x2[:, None] >= x1[None, :])
+        & (y1[:, None] <= y2[None, :])
+        & (y2[:, None] >= y1[None, :])
+    )
+    accepted = np.zeros(widths.size, dtype=bool)
+    for i in range(widths.size):
+        if not (overlaps[i] & accepted).any():
+            accepted[i] = True
+            if np.count_nonzero(accepted) == max_rooms:
+                break
+
+    tiles = np.full((map_width, map_height), tile_types.wall, dtype=tile_types.tile_id_dt, order="F")
+    rooms = [
+        RectangularRoom(int(x1[i]), int(y1[i]), int(widths[i]), int(heights[i]))
+        for i in np.flatnonzero(accepted)
+    ]
+    horizontal_first = rng.random(len(rooms)) < 0.5
+    for i, room in enumerate(rooms):
+        tiles[room.inner] = tile_types.floor
+        if i > 0:
+            # Соединяем с предыдущей комнатой
+            for leg in tunnel_slices(rooms[i - 1].center, room.center, horizontal_first[i]):
+                tiles[leg] = tile_types.floor
+    return tiles, rooms
+
+
+def generate_cave_tiles(
+    map_width: int,
+    map_height: int,
+    seed: int,
+    scale: float = 0.08,
+    octaves: int = 4,
+    floor_threshold: float = -0.1,
+) -> np.ndarray:
+    """
+    Return the tile IDs of a cave made from fractal noise.
+
+    Cells where the noise is above floor_threshold become floor, and only the
+    largest connected cave is kept so the whole floor can be walked. The same
+    seed always gives the same cave. Its red portals are placed by
+    generate_dungeon, together with the stairs.
+
+    A noise field without any floor is made again with the next seed, up to
+    CAVE_ATTEMPTS times, then ValueError is raised.
+    """
+    grid = tcod.noise.grid((map_width, map_height), scale, indexing="ij")
+    for attempt in range(CAVE_ATTEMPTS):
+        noise = tcod.noise.Noise(
+            dimensions=2,
+            algorithm=tcod.noise.Algorithm.SIMPLEX,
+            implementation=tcod.noise.Implementation.FBM,
+            octaves=octaves,
+            seed=(seed + attempt) & 0xFFFFFFFF,
+        )
+        floor = noise[grid] > floor_threshold
+        # Края карты всегда стены
+        floor[[0, -1], :] = False
+        floor[:, [0, -1]] = False
+        if floor.any():
+            break
+    else:
+        raise ValueError(
+            f"No cave floor in a {map_width}x{map_height} map after {CAVE_ATTEMPTS} seeds from {seed}."
+        )
+
+    # Оставляем только самую большую пещеру
+    labels = label_regions(floor)
+    if labels.max() > 0:
+        sizes = np.bincount(labels.ravel())
+        sizes[0] = 0
+        floor = labels == sizes.argmax()
+
+    tiles = np.full((map_width, map_height), tile_types.wall, dtype=tile_types.tile_id_dt, order="F")
+    tiles[floor] = tile_types.floor
+    return tiles
+
+
 def generate_dungeon(
     max_rooms: int,
     room_min_size: int,
@@ -208,191 +504,59 @@ def generate_dungeon(
     map_width: int,
     map_height: int,
     engine: Engine,
+    layout: str = "asset",
+    seed: Optional[int] = None,
 ) -> GameMap:
-    """Generate a new dungeon map."""
+    """
+    Generate a new dungeon map.
+
+    layout picks the base map: "caves" generates one with generate_cave_tiles
+    and "rooms" with generate_room_tiles, both from seed. Any other layout is the
+    name of a map in assets/maps, for example one made with editormaps, and the
+    floor takes the size of that map. "asset" is the pre-built dungeon_1_lvl map.
+    """
+    map_name = None
+    if layout not in GENERATED_LAYOUTS:
+        map_name = DEFAULT_DUNGEON_MAP if layout == "asset" else layout
+        if map_name not in maps.available_maps():
+            raise ValueError(
+                f"Unknown dungeon layout {layout!r}, expected caves, rooms or a map in {maps.MAPS_DIR}."
+            )
+        map_width, map_height = maps.load_layer(map_name).shape
+    report = GenerationReport(
+        "dungeon", floor=engine.game_world.current_floor, layout=layout, width=map_width, height=map_height
+    )
     player = engine.player
     dungeon = GameMap(engine, map_width, map_height, entities=[player])
-    # Генерируем базовую карту используя шум Перлина
-    noise = np.array([
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.9, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.9, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.1, 0.1, 0.9, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.1, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.1, 0.1, 0.9, 0.1, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2],
-    ], dtype=np.float64)
-    
-    dungeon.tiles = np.select(
-    [
-        noise == 0.1,    # Порог для пола
-        noise == 0.9,   # Порог для красного портала
-        noise == 0.8    # Порог для синего портала
-    ],
-    [
-        tile_types.floor,       # Обычный пол
-        tile_types.portal_red,  # Редкие красные порталы
-        tile_types.portal_blue  # Синие порталы
-    ],
-    default=tile_types.wall     # Все остальное - стены
-)
-
-    new_tiles = dungeon.tiles.copy()
-    dungeon.tiles = new_tiles
-    # Гарантируем наличие проходимого пути от входа к выходу
-    def find_valid_position():
-        while True:
-            x = random.randint(1, map_width - 2)
-            y = random.randint(1, map_height - 2)
-            if dungeon.tiles[x, y] == tile_types.floor:
-                return x, y
-            
-    def find_valid_positions_for_group(
-        num_positions_needed: int,
-        max_attempts: int = 1000 # Максимальное количество попыток найти подходящие позиции
-    ) -> List[Tuple[int, int]] | None:
-        """
-        Находит список из num_positions_needed соседних валидных позиций
-        для размещения группы монстров. Позиции находятся рядом друг с другом,
-        например, в виде прямоугольника 3xN.
-
-        Возвращает список (x, y) координат или None, если не удалось найти.
-        """
-        map_width = dungeon.width
-        map_height = dungeon.height
-
-        # Попробуем найти стартовую позицию, от которой будем "растить" группу
-        for _ in range(max_attempts):
-            start_x = random.randint(1, map_width - 2)
-            start_y = random.randint(1, map_height - 2)
-
-            # Проверим, валидна ли стартовая позиция
-            if dungeon.tiles[start_x, start_y] != tile_types.floor:
-                continue # Попробуем другую стартовую позицию
-
-            # Рассчитаем потенциальные позиции для группы, начиная со start_x, start_y
-            potential_positions = []
-            found_all = True
-
-            for i in range(num_positions_needed):
-                # Распределяем по сетке 3xN, как в твоей функции spawn_monster_group
-                offset_x = start_x + (i % 3)
-                offset_y = start_y + (i // 3)
-
-                # Проверим границы карты
-                if not (0 <= offset_x < map_width and 0 <= offset_y < map_height):
-                    found_all = False
-                    break
-
-                # Проверим, что позиция валидна (пол, не стена и не другая сущность)
-                if dungeon.tiles[offset_x, offset_y] != tile_types.floor:
-                    found_all = False
-                    break
-
-                # Проверим, что на этой позиции нет сущностей
-                # Это может быть избыточно, если spawn потом сам проверяет и перемещает,
-                # но для гарантии можно проверить заранее.
-                if any(entity.x == offset_x and entity.y == offset_y for entity in dungeon.entities):
-                    found_all = False
-                    break
-
-                potential_positions.append((offset_x, offset_y))
-
-            if found_all:
-                # Успешно нашли num_positions_needed валидных позиций
-                return potential_positions
-
-        # Не удалось найти подходящее место за max_attempts
-        return None
-
+    marked_monsters: List[Tuple[int, int]] = []
+    marked_items: List[Tuple[int, int]] = []
+    player_spawns: List[Tuple[int, int]] = []
+    if layout in ("caves", "rooms") and seed is None:
+        seed = random.getrandbits(32)
+    report.info["seed"] = seed
+    if layout == "caves":
+        dungeon.tiles = generate_cave_tiles(map_width, map_height, seed)
+    elif layout == "rooms":
+        dungeon.tiles, rooms = generate_room_tiles(
+            map_width, map_height, max_rooms, room_min_size, room_max_size, seed
+        )
+        # Игрок начинает в первой комнате
+        player_spawns = [rooms[0].center] if rooms else []
+    else:
+        # Базовая карта берётся из готовых ассетов (assets/maps)
+        dungeon.tiles = maps.load_tiles(map_name)
+        # Точки спавна, расставленные в редакторе карт
+        marked_monsters = maps.marker_positions(map_name, maps.MARKER_ENEMY)
+        marked_items = maps.marker_positions(map_name, maps.MARKER_ITEM)
+        player_spawns = maps.marker_positions(map_name, maps.MARKER_PLAYER)
+    report.mark("tiles")
     # Размещаем игрока в проходимой области
-    player_x, player_y = find_valid_position()
+    player_x, player_y = random.choice(player_spawns) if player_spawns else find_valid_position(dungeon, report)
     player.place(player_x, player_y, dungeon)
-    # Размещаем сущности
-    if hasattr(engine, "game_map") and engine.game_map:
-        for entity in engine.game_map.actors:
-            if hasattr(entity, "ai") and hasattr(entity.ai, "in_party") and entity.ai.in_party:
-                # Находим случайную проходимую позицию рядом с игроком
-                for _ in range(10):  # Пробуем 10 раз найти подходящую позицию
-                    dx = random.randint(-2, 2)
-                    dy = random.randint(-2, 2)
-                    new_x, new_y = player_x + dx, player_y + dy
-                    if dungeon.tiles[new_x, new_y]["walkable"]:
-                        entity.spawn(dungeon, new_x, new_y)
-                        break
+    # Отряд игрока переходит на новый этаж вместе с ним
+    if getattr(engine, "game_map", None):
+        place_party(dungeon, player_x, player_y, party_members(engine.game_map))
+    report.mark("player")
     number_of_monsters = random.randint(
         5, get_max_value_for_floor(max_monsters_by_floor, engine.game_world.current_floor)
     )
@@ -411,49 +575,123 @@ def generate_dungeon(
     # Сколько осталось слотов под одиночных монстров
     number_of_single_monsters = number_of_monsters - number_of_groups_to_attempt
 
-    # Теперь получим одиночных монстров (только Entity, без строк)
-    # Для этого отфильтруем enemy_chances
-    single_monster_chances = {}
-    for floor_level, chances_list in enemy_chances.items():
-        if floor_level <= engine.game_world.current_floor:
-            single_monster_chances[floor_level] = [item for item in chances_list if not isinstance(item[0], str)]
+    # Одиночные монстры и группы берутся из отдельных таблиц этажа
+    monster_table, group_table = get_spawn_tables(enemy_chances, engine.game_world.current_floor)
+    monsters_single = monster_table.sample(number_of_single_monsters)
+    group_names = group_table.sample(number_of_groups_to_attempt)
+
+    # Монстры не появляются ближе SAFE_RADIUS шагов от игрока и
+    # распределяются по секторам карты пропорционально свободной площади.
+    # Бюджет сектора считается в клетках, каждый спавн тратит по клетке на монстра.
+    distance = placement.walk_distance(dungeon.walkable, (player_x, player_y))
+    safe = (distance >= 0) & (distance <= SAFE_RADIUS)
+    spawnable = free_cells(dungeon) & ~safe
+    marked_monsters = [cell for cell in marked_monsters if not safe[cell]]
+    rng = np.random.default_rng(random.getrandbits(32))
+    sectors = placement.sector_ids(spawnable.shape, SPAWN_SECTOR_SIZE)
+    budget = placement.sector_capacity(spawnable, sectors, FREE_CELLS_PER_SPAWN)
+
+    def spawn_anchor(footprint: np.ndarray) -> Optional[Tuple[int, int]]:
+        """Return where a whole spawn goes, anchored in a sector which still has budget for it."""
+        size = len(footprint)
+        while marked_monsters:
+            x, y = marked_monsters.pop()
+            if placement.fits(spawnable, footprint, x, y) and budget[sectors[x, y]] >= size:
+                return x, y
+        while True:
+            sector = placement.pick_sector(budget, size, rng)
+            if sector is None:
+                return None
+            # Якорь лежит в секторе, а группа может занять клетки соседних
+            anchors = placement.box_anchors(
+                spawnable, footprint, *placement.sector_box(spawnable.shape, SPAWN_SECTOR_SIZE, sector)
+            )
+            if len(anchors):
+                x, y = anchors[rng.integers(len(anchors))]
+                return int(x), int(y)
+            # Спавн такой формы в сектор не влезает, его бюджет больше не предлагаем
+            report.count("sectors_full")
+            budget[sector] = min(budget[sector], size - 1)
 
-    # Используем отфильтрованный словарь для получения одиночных монстров
-    monsters_single = get_entities_at_random(
-        single_monster_chances, number_of_single_monsters, engine.game_world.current_floor
-    )
+    # --- Спавн групп ---
+    for group_name in group_names:
+        footprint = MONSTER_GROUPS[group_name]["footprint"]
+        anchor = spawn_anchor(footprint)
+        if anchor is None:
+            report.count("spawns_over_budget")
+            continue
+        budget[sectors[anchor]] -= len(footprint)
+        group = spawn_monster_group(group_name, dungeon, anchor[0], anchor[1], spawnable)
+        report.count("groups")
+        report.count("deepcopies", len(group.members))
+    report.mark("groups")
 
     # --- Спавн одиночных монстров ---
     for entity in monsters_single:
-        x, y = find_valid_position()
-        entity.spawn(dungeon, x, y)
-
-    # --- Спавн групп ---
-    for _ in range(number_of_groups_to_attempt):
-        group_name = get_group_at_random(enemy_chances, engine.game_world.current_floor) # Импортируй procgen
-        if group_name:
-            # Попробуем заспавнить группу в любом месте на карте
-            # Используем find_valid_position для стартовой точки
-            start_x, start_y = find_valid_position()
-            # Вызовем нашу функцию спавна группы
-            spawn_monster_group(group_name, dungeon, start_x, start_y) # Убедись, что spawn_monster_group импортирована или доступна
-
-    # --- Спавн предметов (как и раньше) ---
+        anchor = spawn_anchor(SINGLE_FOOTPRINT)
+        if anchor is None:
+            report.count("spawns_over_budget")
+            continue
+        budget[sectors[anchor]] -= 1
+        entity.spawn(dungeon, *anchor)
+        spawnable[anchor] = False
+        report.count("monsters")
+        report.count("deepcopies")
+    report.mark("monsters")
+
+    # --- Спавн предметов ---
     items = get_entities_at_random(
         item_chances, number_of_items, engine.game_world.current_floor
     )
+    item_cells = [
+        (int(x), int(y))
+        for x, y in placement.budget_cells(
+            free_cells(dungeon), len(items), SPAWN_SECTOR_SIZE, FREE_CELLS_PER_SPAWN, rng
+        )
+    ]
     for entity in items:
-        x, y = find_valid_position()
+        if marked_items:
+            x, y = marked_items.pop()
+        elif item_cells:
+            x, y = item_cells.pop()
+        else:
+            report.count("spawns_over_budget")
+            continue
         entity.spawn(dungeon, x, y)
-    # Размещаем лестницу в проходимой области
-# Place two down stairs in different locations
-    for _ in range(2):
-        stairs_x, stairs_y = find_valid_position()
-        # Ensure the second stairs is not placed at the same location as the first
-        while any(loc == (stairs_x, stairs_y) for loc in dungeon.downstairs_locations):
-            stairs_x, stairs_y = find_valid_position()
-        dungeon.tiles[stairs_x, stairs_y] = tile_types.down_stairs
-        dungeon.downstairs_locations.append((stairs_x, stairs_y))
+        report.count("items")
+        report.count("deepcopies")
+    report.mark("items")
+    # Размещаем лестницы, а в пещерах и красные порталы, подальше от игрока и друг от друга
+    # Они должны быть достижимы от игрока, если в его области есть для них место
+    candidates = dungeon.tiles == tile_types.floor
+    reachable = dungeon.region_labels == dungeon.region_labels[player_x, player_y]
+    if np.count_nonzero(candidates & reachable) > 2:
+        candidates &= reachable
+    features = [tile_types.down_stairs] * 2
+    if layout == "caves":
+        portals = max(1, round(np.count_nonzero(candidates) * CAVE_PORTAL_CHANCE))
+        features += [tile_types.portal_red] * portals
+    score = distance
+    xs, ys = np.ogrid[: dungeon.width, : dungeon.height]
+    for tile in features:
+        if tile != tile_types.down_stairs:
+            # Порталы не ставим рядом со стартом
+            away = candidates & (distance > SAFE_RADIUS)
+            cell = placement.pick_far(score, away if away.any() else candidates)
+        else:
+            cell = placement.pick_far(score, candidates)
+        if cell is None:
+            break
+        dungeon.set_tile(*cell, tile)
+        if tile == tile_types.down_stairs:
+            dungeon.downstairs_locations.append(cell)
+        candidates[cell] = False
+        # Следующая клетка - далеко и от игрока, и от уже поставленных
+        score = np.minimum(score, np.maximum(abs(xs - cell[0]), abs(ys - cell[1])))
+    report.mark("stairs")
+    dungeon.build_region_graph()
+    report.mark("region_graph")
+    report.finish(dungeon)
     return dungeon
 
 def generate_city(
@@ -463,175 +701,92 @@ def generate_city(
     map_width: int,
     map_height: int,
     engine: Engine,
+    map_name: str = "city",
 ) -> GameMap:
-    """Generate a city map."""
+    """
+    Generate a city map.
+
+    The map_name map from assets/maps is the base of the city when it has the
+    requested size, otherwise an open walled square is used.
+    """
+    report = GenerationReport("city", floor=engine.game_world.current_floor, width=map_width, height=map_height)
     player = engine.player
     city = GameMap(engine, map_width, map_height, entities=[player])
     
     # Заполняем карту полом
-    noise = np.array([
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2,0.2, 0.2, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.9, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.5, 0.5, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.5, 0.5, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.5, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.9, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.9, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.8, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1,0.1, 0.1, 0.2],
-        [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2,0.2, 0.2, 0.2],
-    ], dtype=np.float64)
-    
-    city.tiles = np.select(
-    [
-        noise == 0.1,    # Порог для пола
-        noise == 0.9,   # Порог для красного портала
-        noise == 0.8    # Порог для синего портала
-    ],
-    [
-        tile_types.floor,       # Обычный пол
-        tile_types.portal_red,  # Редкие красные порталы
-        tile_types.portal_blue  # Синие порталы
-    ],
-    default=tile_types.wall     # Все остальное - стены
-)
-    
-    def find_valid_position():
-        while True:
-            x = random.randint(1, map_width - 2)
-            y = random.randint(1, map_height - 2)
-            if city.tiles[x, y] == tile_types.floor:
-                return x, y
-    # Размещаем игрока в проходимой области
-    player_x, player_y = find_valid_position()
-    player.place(player_x, player_y, city)
-    if hasattr(engine, "game_map") and engine.game_map:
-        for entity in engine.game_map.actors:
-            if hasattr(entity, "ai") and hasattr(entity.ai, "in_party") and entity.ai.in_party:
-                # Находим случайную проходимую позицию рядом с игроком
-                for _ in range(10):  # Пробуем 10 раз найти подходящую позицию
-                    dx = random.randint(-2, 2)
-                    dy = random.randint(-2, 2)
-                    new_x, new_y = player_x + dx, player_y + dy
-                    if city.tiles[new_x, new_y]["walkable"]:
-                        entity.spawn(city, new_x, new_y)
-                        break
-    
-    for i in range(50):
-        x = random.randint(1, map_width - 1)
-        y = random.randint(1, map_height - 1)
-        npc = copy.deepcopy(entity_factories.npc)
-        npc.spawn(city, x, y)
-        
-    
+    player_spawns: List[Tuple[int, int]] = []
+    if map_name in maps.available_maps() and maps.load_layer(map_name).shape == (map_width, map_height):
+        city.tiles = maps.load_tiles(map_name)
+        player_spawns = maps.marker_positions(map_name, maps.MARKER_PLAYER)
+    else:
+        # Для карт другого размера - открытая площадь, обнесённая стеной
+        city.set_tiles((slice(1, -1), slice(1, -1)), tile_types.floor)
+
+    # Портал в подземелье в центре города
+    center_x = map_width // 2
+    center_y = map_height // 2
+    city.set_tile(center_x, center_y, tile_types.portal_blue)
+    report.mark("tiles")
+
     # Создаем здания (комнаты)
+    # Свободные клетки: всё, кроме стен карты, портала и уже построенных зданий с улицей вокруг них
+    free = city.walkable.copy()
+    free[center_x, center_y] = False
+    anchors = placement.RectAnchors(free)
     rooms: List[RectangularRoom] = []
-    
+
     for _ in range(max_rooms):
         room_width = random.randint(room_min_size, room_max_size)
         room_height = random.randint(room_min_size, room_max_size)
-        
-        x = random.randint(1, map_width - room_width - 1)
-        y = random.randint(1, map_height - room_height - 1)
-        
-        new_room = RectangularRoom(x, y, room_width, room_height)
-        center_x = map_width // 2
-        center_y = map_height // 2
-        city.tiles[center_x, center_y] = tile_types.portal_blue
-        
-        if any(new_room.intersects(other_room) for other_room in rooms):
+
+        spot = anchors.pick(room_width, room_height)
+        if spot is None:
+            report.count("buildings_skipped")
             continue
-            
+        new_room = RectangularRoom(*spot, room_width, room_height)
+        anchors.occupy(new_room.x1 - 1, new_room.y1 - 1, new_room.x2 + 1, new_room.y2 + 1)
+
         # Создаем стены комнаты
-        city.tiles[new_room.x1:new_room.x2, new_room.y1] = tile_types.wall
-        city.tiles[new_room.x1:new_room.x2, new_room.y2-1] = tile_types.wall
-        city.tiles[new_room.x1, new_room.y1:new_room.y2] = tile_types.wall
-        city.tiles[new_room.x2-1, new_room.y1:new_room.y2] = tile_types.wall
+        city.set_tiles((slice(new_room.x1, new_room.x2), new_room.y1), tile_types.wall)
+        city.set_tiles((slice(new_room.x1, new_room.x2), new_room.y2-1), tile_types.wall)
+        city.set_tiles((new_room.x1, slice(new_room.y1, new_room.y2)), tile_types.wall)
+        city.set_tiles((new_room.x2-1, slice(new_room.y1, new_room.y2)), tile_types.wall)
         
         # Добавляем дверь в случайном месте на одной из стен
         wall = random.randint(0, 3)  # Выбираем случайную стену
         if wall == 0:  # Верхняя стена
             door_x = random.randint(new_room.x1 + 1, new_room.x2 - 2)
-            city.tiles[door_x, new_room.y1] = tile_types.door
+            city.set_tile(door_x, new_room.y1, tile_types.door)
         elif wall == 1:  # Нижняя стена
             door_x = random.randint(new_room.x1 + 1, new_room.x2 - 2)
-            city.tiles[door_x, new_room.y2-1] = tile_types.door
+            city.set_tile(door_x, new_room.y2-1, tile_types.door)
         elif wall == 2:  # Левая стена
             door_y = random.randint(new_room.y1 + 1, new_room.y2 - 2)
-            city.tiles[new_room.x1, door_y] = tile_types.door
+            city.set_tile(new_room.x1, door_y, tile_types.door)
         else:  # Правая стена
             door_y = random.randint(new_room.y1 + 1, new_room.y2 - 2)
-            city.tiles[new_room.x2-1, door_y] = tile_types.door
+            city.set_tile(new_room.x2-1, door_y, tile_types.door)
         rooms.append(new_room)
+    report.count("buildings", len(rooms))
+    report.mark("buildings")
+
+    # Размещаем игрока в проходимой области
+    player_x, player_y = random.choice(player_spawns) if player_spawns else find_valid_position(city, report)
+    player.place(player_x, player_y, city)
+    if getattr(engine, "game_map", None):
+        place_party(city, player_x, player_y, party_members(engine.game_map))
+    report.mark("player")
     
-    return city
\ No newline at end of file
+    for i in range(50):
+        x = random.randint(1, map_width - 1)
+        y = random.randint(1, map_height - 1)
+        npc = copy.deepcopy(entity_factories.npc)
+        npc.spawn(city, x, y)
+    report.count("npcs", 50)
+    report.count("deepcopies", 2 * 50)
+    report.mark("npcs")
+
+    city.build_region_graph()
+    report.mark("region_graph")
+    report.finish(city)
+    return city
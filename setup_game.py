@@ -3,44 +3,81 @@ from __future__ import annotations
 
 import copy
 import lzma
+import os
 import pickle
+import random
 import traceback
-from typing import Optional
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
 
+import numpy as np  # type: ignore
 import tcod
 
 import color
 from engine import Engine
 import entity_factories
-from game_map import GameWorld
+from game_map import GameWorld, pack_floor
 import input_handlers
 
 
+# Размеры комнат и зданий для всех этажей
+MAX_ROOMS = 30
+ROOM_MIN_SIZE = 6
+ROOM_MAX_SIZE = 10
 
 
-def new_game() -> Engine:
-    """Return a brand new game session as an Engine instance."""
-    map_width = 80
-    map_height = 43
+def new_game(
+    map_width: int = 80,
+    map_height: int = 43,
+    map_storage_dir: Optional[str] = None,
+    seed: Optional[int] = None,
+    pregenerate_floors: int = 0,
+    workers: Optional[int] = None,
+) -> Engine:
+    """Return a brand new game session as an Engine instance.
 
-    room_max_size = 10
-    room_min_size = 6
-    max_rooms = 30
+    Maps larger than the console are drawn through the engine's camera. With
+    map_storage_dir the map layers are kept in memory-mapped files, in a new
+    subdirectory of it for every game so games never share files. A seed
+    makes the generated dungeon layouts repeatable.
+
+    pregenerate_floors dungeon floors below the city are generated right away in
+    worker processes, while the city is generated here. They are kept packed
+    until the player gets there.
+    """
+    if pregenerate_floors and seed is None:
+        # Каждый этаж получает свой seed от seed мира
+        seed = random.getrandbits(32)
 
     player = copy.deepcopy(entity_factories.player)
 
     engine = Engine(player=player)
+    if map_storage_dir is not None:
+        engine.map_storage_dir = os.path.join(map_storage_dir, uuid.uuid4().hex)
 
     engine.game_world = GameWorld(
         engine=engine,
-        max_rooms=max_rooms,
-        room_min_size=room_min_size,
-        room_max_size=room_max_size,
+        max_rooms=MAX_ROOMS,
+        room_min_size=ROOM_MIN_SIZE,
+        room_max_size=ROOM_MAX_SIZE,
         map_width=map_width,
         map_height=map_height,
+        seed=seed,
     )
 
-    engine.game_world.generate_floor()
+    if pregenerate_floors:
+        floors = range(2, 2 + pregenerate_floors)
+        jobs = [
+            (floor, map_width, map_height, seed, engine.game_world.layout_for_floor(floor))
+            for floor in floors
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            packed = pool.map(pack_new_floor, jobs)
+            engine.game_world.generate_floor()
+            engine.game_world.packed_floors.update(zip(floors, packed))
+    else:
+        engine.game_world.generate_floor()
     engine.update_fov()
 
     engine.message_log.add_message(
@@ -62,6 +99,45 @@ def new_game() -> Engine:
     return engine
 
 
+def new_floor(
+    floor: int,
+    map_width: int = 80,
+    map_height: int = 43,
+    seed: Optional[int] = None,
+    layout: Optional[str] = None,
+) -> Engine:
+    """Return an Engine holding a single generated floor, without a game around it.
+
+    Used by tools which generate floors in bulk. With a seed the whole floor,
+    monsters and items included, is the same on every run.
+    """
+    player = copy.deepcopy(entity_factories.player)
+    engine = Engine(player=player)
+    engine.game_world = GameWorld(
+        engine=engine,
+        max_rooms=MAX_ROOMS,
+        room_min_size=ROOM_MIN_SIZE,
+        room_max_size=ROOM_MAX_SIZE,
+        map_width=map_width,
+        map_height=map_height,
+        current_floor=floor - 1,
+        seed=seed,
+    )
+    if layout is not None:
+        engine.game_world.floor_layouts[floor] = layout
+    if seed is not None:
+        # Монстры и предметы расставляются через модуль random
+        random.seed(int(np.random.SeedSequence([seed, floor]).generate_state(1)[0]))
+    engine.game_world.generate_floor()
+    return engine
+
+
+def pack_new_floor(job: Tuple[int, int, int, int, str]) -> bytes:
+    """Generate a floor with new_floor and return it packed, for worker processes."""
+    floor, map_width, map_height, seed, layout = job
+    return pack_floor(new_floor(floor, map_width, map_height, seed=seed, layout=layout).game_map)
+
+
 def load_game(filename: str) -> Engine:
     """Load an Engine instance from a file."""
     with open(filename, "rb") as f:
@@ -0,0 +1,43 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+import procgen
+import setup_game
+import tile_types
+
+
+def test_cave_is_repeatable():
+    a = procgen.generate_cave_tiles(60, 40, seed=7)
+    b = procgen.generate_cave_tiles(60, 40, seed=7)
+    assert np.array_equal(a, b)
+    assert (a == tile_types.floor).any()
+
+
+def test_cave_without_floor_raises():
+    with pytest.raises(ValueError):
+        procgen.generate_cave_tiles(40, 30, seed=1, floor_threshold=2.0)
+
+
+def test_tiny_caves_always_get_floor():
+    # На картах 5x5 часть сидов не даёт пола, тогда берётся следующий сид
+    for seed in range(30):
+        tiles = procgen.generate_cave_tiles(5, 5, seed)
+        assert (tiles == tile_types.floor).any()
+        random.seed(seed)
+        engine = setup_game.new_floor(2, 5, 5, seed=seed, layout="caves")
+        player = engine.player
+        assert engine.game_map.walkable[player.x, player.y]
+
+
+def test_no_floor_for_the_player_raises():
+    player = copy.deepcopy(entity_factories.player)
+    game_map = GameMap(Engine(player=player), 10, 10, entities=[player])
+    report = procgen.GenerationReport("test")
+    with pytest.raises(ValueError):
+        procgen.find_valid_position(game_map, report)
@@ -0,0 +1,66 @@
+import copy
+import random
+
+import ai_planning
+from components.ai import HostileRanged
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+import procgen
+import tile_types
+
+
+def build_engine() -> Engine:
+    random.seed(1)
+    player = copy.deepcopy(entity_factories.player)
+    player.fighter.max_hp = player.fighter.hp = 10_000
+    engine = Engine(player=player)
+    game_map = GameMap(engine, 60, 40, entities=[player])
+    game_map.set_tiles((slice(1, -1), slice(1, -1)), tile_types.floor)
+    game_map.build_region_graph()
+    engine.game_map = game_map
+    player.place(30, 20, game_map)
+    return engine
+
+
+def distances(engine: Engine, members) -> list:
+    player = engine.player
+    return [max(abs(m.x - player.x), abs(m.y - player.y)) for m in members if m.is_alive]
+
+
+def test_group_leader_chases():
+    engine = build_engine()
+    group = procgen.spawn_monster_group("goba3", engine.game_map, 20, 20)
+    # Лучник не ведёт группу, ведёт первый монстр ближнего боя
+    assert group.leader is group.members[1]
+
+
+def test_group_closes_on_visible_player():
+    engine = build_engine()
+    group = procgen.spawn_monster_group("goba3", engine.game_map, 20, 20)
+    start = distances(engine, group.members)
+    for _ in range(30):
+        engine.update_fov()
+        engine.handle_enemy_turns()
+    end = distances(engine, group.members)
+    melee = [m for m in group.members if not isinstance(m.ai, HostileRanged)]
+    assert all(d <= 1 for d in distances(engine, melee))
+    assert max(end) < max(start)
+
+
+def test_group_plans_one_path_per_turn(monkeypatch):
+    engine = build_engine()
+    procgen.spawn_monster_group("goba3", engine.game_map, 24, 20)
+    calls = []
+    find_path = ai_planning.find_path
+
+    def counting_find_path(*args, **kwargs):
+        calls.append(args[1])
+        return find_path(*args, **kwargs)
+
+    monkeypatch.setattr(ai_planning, "find_path", counting_find_path)
+    for _ in range(2):
+        engine.update_fov()
+        engine.handle_enemy_turns()
+    # Пока группа не подошла вплотную, путь ищет только вожак, остальные держат строй
+    assert 0 < len(calls) <= 2
@@ -0,0 +1,112 @@
+import random
+
+import numpy as np
+
+import placement
+
+
+def test_rect_anchors_follow_occupied_boxes():
+    random.seed(1)
+    free = np.random.default_rng(1).random((60, 40)) > 0.05
+    anchors = placement.RectAnchors(free.copy())
+    sizes = [(width, height) for width in range(1, 9) for height in range(1, 9)]
+    for width, height in sizes:
+        anchors.valid(width, height)
+    for _ in range(100):
+        x, y = random.randrange(-12, 60), random.randrange(-12, 40)
+        anchors.occupy(x, y, x + random.randint(0, 12), y + random.randint(0, 12))
+        # Обновлённые окна совпадают с пересчётом с нуля
+        for width, height in sizes:
+            expected = placement.rect_blocked(anchors.free, width, height) == 0
+            assert np.array_equal(anchors.valid(width, height), expected)
+
+
+def test_rect_anchors_pick_until_full():
+    random.seed(2)
+    anchors = placement.RectAnchors(np.ones((30, 20), dtype=bool))
+    placed = []
+    while True:
+        spot = anchors.pick(5, 4)
+        if spot is None:
+            break
+        x, y = spot
+        assert anchors.free[x : x + 5, y : y + 4].all()
+        anchors.occupy(x, y, x + 5, y + 4)
+        placed.append(spot)
+    assert len(placed) >= 6
+    assert not (placement.rect_blocked(anchors.free, 5, 4) == 0).any()
+
+
+def brute_force_anchors(free: np.ndarray, footprint: np.ndarray) -> set:
+    width, height = free.shape
+    return {
+        (x, y)
+        for x in range(-5, width + 5)
+        for y in range(-5, height + 5)
+        if placement.fits(free, footprint, x, y)
+    }
+
+
+def test_anchors_avoid_walls_and_occupied_cells():
+    rng = np.random.default_rng(4)
+    free = rng.random((30, 20)) > 0.15
+    placement.occupy(free, placement.rect_footprint(4, 3), 10, 8)
+    footprints = [
+        placement.rect_footprint(3, 2),
+        np.array([[0, 0], [1, 0], [0, 1], [-1, 1]]),  # не прямоугольник
+        np.array([[0, 0], [2, 0], [4, 1]]),  # с дырами
+    ]
+    for footprint in footprints:
+        found = {tuple(anchor) for anchor in placement.footprint_anchors(free, footprint).tolist()}
+        assert found == brute_force_anchors(free, footprint)
+    rect = {tuple(anchor) for anchor in placement.rect_anchors(free, 3, 2).tolist()}
+    assert rect == brute_force_anchors(free, placement.rect_footprint(3, 2))
+
+
+def test_box_anchors_stay_in_box():
+    rng = np.random.default_rng(5)
+    free = rng.random((40, 40)) > 0.2
+    footprint = np.array([[0, 0], [1, 0], [-1, 1]])
+    xs, ys = slice(16, 32), slice(0, 16)
+    anchors = {tuple(anchor) for anchor in placement.box_anchors(free, footprint, xs, ys).tolist()}
+    expected = {(x, y) for x, y in brute_force_anchors(free, footprint) if 16 <= x < 32 and 0 <= y < 16}
+    assert anchors == expected
+
+
+def test_pick_far_walks_around_walls():
+    # Стена почти делит карту: выход справа близко по прямой, но далеко пешком
+    walkable = np.zeros((20, 12), dtype=bool)
+    walkable[1:-1, 1:-1] = True
+    walkable[10, 1:-2] = False
+    walkable[15:19, 3:6] = False
+    walkable[16, 4] = True  # замурованная клетка, до неё не дойти
+    start = (8, 2)
+    distance = placement.walk_distance(walkable, start)
+    assert distance[16, 4] == -1
+    random.seed(0)
+    for _ in range(20):
+        cell = placement.pick_far(distance, walkable & (distance >= 0), fraction=0.05)
+        assert distance[cell] >= 0
+        # Ячейка из самых далёких пешком
+        assert distance[cell] >= np.sort(distance[walkable & (distance >= 0)])[-8]
+        assert cell[0] > 10
+
+
+def test_sector_budgets_sum_and_capacity():
+    rng = np.random.default_rng(6)
+    mask = rng.random((70, 45)) > 0.4
+    sectors = placement.sector_ids(mask.shape, 16)
+    capacity = placement.sector_capacity(mask, sectors, 20)
+    for count in (0, 1, 7, 40, int(capacity.sum()), 10_000):
+        budget = placement.sector_budgets(mask, sectors, count, 20)
+        assert budget.sum() == min(count, capacity.sum())
+        assert (budget <= capacity).all()
+        assert (budget >= 0).all()
+
+
+def test_pick_sector_needs_room_for_the_spawn():
+    rng = np.random.default_rng(7)
+    budget = np.array([0, 2, 5, 1])
+    picked = {placement.pick_sector(budget, 3, rng) for _ in range(50)}
+    assert picked == {2}
+    assert placement.pick_sector(budget, 6, rng) is None
@@ -0,0 +1,116 @@
+import copy
+from collections import deque
+
+import numpy as np
+
+from components.ai import HostileEnemy
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+from pathfinding import label_regions
+import tile_types
+
+# "#" стена, "." пол; области соединяются и по диагонали
+FIXED_MAP = [
+    "##########",
+    "#..#....##",
+    "#..#.##..#",
+    "####.##.##",
+    "#...#..#.#",
+    "#.#.##.#.#",
+    "##.####..#",
+    "#.#..#####",
+    "#...##..##",
+    "##########",
+]
+
+
+def build_engine() -> Engine:
+    """A 30x12 map split by a wall at x = 15, player on the left."""
+    player = copy.deepcopy(entity_factories.player)
+    engine = Engine(player=player)
+    game_map = GameMap(engine, 30, 12, entities=[player])
+    game_map.set_tiles((slice(1, -1), slice(1, -1)), tile_types.floor)
+    game_map.set_tiles((15, slice(None)), tile_types.wall)
+    engine.game_map = game_map
+    player.place(5, 5, game_map)
+    return engine
+
+
+def test_same_region():
+    game_map = build_engine().game_map
+    assert game_map.same_region((2, 2), (13, 10))
+    assert not game_map.same_region((2, 2), (20, 5))
+    # Стена не принадлежит ни одной области
+    assert not game_map.same_region((15, 5), (15, 5))
+    game_map.set_tile(15, 5, tile_types.floor)
+    assert game_map.same_region((2, 2), (20, 5))
+
+
+def test_no_path_to_other_region():
+    engine = build_engine()
+    troll = entity_factories.troll.spawn(engine.game_map, 20, 5)
+    assert troll.ai.get_path_to(engine.player.x, engine.player.y) == []
+
+
+def test_target_choice_skips_unreachable():
+    engine = build_engine()
+    game_map = engine.game_map
+    # Игрок ближе, но за стеной; NPC дальше, зато в той же области
+    troll = entity_factories.troll.spawn(game_map, 17, 5)
+    npc = entity_factories.npc.spawn(game_map, 27, 10)
+    assert isinstance(troll.ai, HostileEnemy)
+    engine.update_fov()
+    game_map.visible[:] = True
+    start = max(abs(troll.x - npc.x), abs(troll.y - npc.y))
+    for _ in range(3):
+        troll.ai.perform()
+    assert max(abs(troll.x - npc.x), abs(troll.y - npc.y)) < start
+
+
+def flood_fill(walkable: np.ndarray) -> np.ndarray:
+    """Label the areas one cell at a time with a breadth-first search."""
+    labels = np.zeros(walkable.shape, dtype=np.int32)
+    width, height = walkable.shape
+    count = 0
+    for start in zip(*np.nonzero(walkable)):
+        if labels[start]:
+            continue
+        count += 1
+        labels[start] = count
+        queue = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < width and 0 <= ny < height and walkable[nx, ny] and not labels[nx, ny]:
+                        labels[nx, ny] = count
+                        queue.append((nx, ny))
+    return labels
+
+
+def same_partition(a: np.ndarray, b: np.ndarray) -> bool:
+    """True if both labelings split the cells into the same areas."""
+    if not np.array_equal(a == 0, b == 0):
+        return False
+    pairs = np.unique(np.stack([a[a > 0], b[b > 0]]), axis=1)
+    return pairs.shape[1] == len(np.unique(a[a > 0])) == len(np.unique(b[b > 0]))
+
+
+def test_label_regions_fixed_map():
+    walkable = np.array([[ch == "." for ch in row] for row in FIXED_MAP]).T
+    labels = label_regions(walkable)
+    expected = flood_fill(walkable)
+    assert same_partition(labels, expected)
+    assert labels.max() == expected.max() == 3
+    # Клетки (4, 3) и (3, 4) касаются только углами
+    assert labels[4, 3] == labels[3, 4]
+
+
+def test_label_regions_random_maps():
+    rng = np.random.default_rng(3)
+    for density in (0.3, 0.5, 0.6, 0.8):
+        walkable = rng.random((40, 25)) < density
+        assert same_partition(label_regions(walkable), flood_fill(walkable))
+    assert not label_regions(np.zeros((5, 5), dtype=bool)).any()
@@ -0,0 +1,28 @@
+import json
+import random
+
+import procgen
+import setup_game
+
+DUNGEON_STAGES = ["tiles", "player", "groups", "monsters", "items", "stairs", "region_graph"]
+CITY_STAGES = ["tiles", "buildings", "player", "npcs", "region_graph"]
+
+
+def test_stages_untimed_by_default(monkeypatch):
+    monkeypatch.setattr(procgen, "REPORT_FILE", None)
+    random.seed(0)
+    report = setup_game.new_floor(2, 80, 43, seed=0, layout="caves").game_map.generation_report
+    assert report.stages == {}
+    assert report.counters.get("groups", 0) > 0
+
+
+def test_report_file_times_stages(monkeypatch, tmp_path):
+    report_file = tmp_path / "report.jsonl"
+    monkeypatch.setattr(procgen, "REPORT_FILE", str(report_file))
+    random.seed(0)
+    setup_game.new_floor(1, 80, 43, seed=0)
+    setup_game.new_floor(2, 80, 43, seed=0, layout="caves")
+    city, dungeon = [json.loads(line) for line in report_file.read_text().splitlines()]
+    assert list(city["stages_ms"]) == CITY_STAGES
+    assert list(dungeon["stages_ms"]) == DUNGEON_STAGES
+    assert dungeon["total_ms"] >= sum(dungeon["stages_ms"].values()) - 0.01
@@ -0,0 +1,91 @@
+import copy
+
+from actions import MovementAction
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+import tile_types
+
+
+def build_engine() -> Engine:
+    """A 20x10 open map, player in the corner out of the way."""
+    player = copy.deepcopy(entity_factories.player)
+    engine = Engine(player=player)
+    game_map = GameMap(engine, 20, 10, entities=[player])
+    game_map.set_tiles((slice(1, -1), slice(1, -1)), tile_types.floor)
+    engine.game_map = game_map
+    player.place(1, 1, game_map)
+    return engine
+
+
+def spawn(engine: Engine, x: int, y: int):
+    return entity_factories.orc.spawn(engine.game_map, x, y)
+
+
+def resolve(engine: Engine, moves) -> list:
+    """Resolve and carry out the moves like a batched turn, return the accepted ones."""
+    accepted = engine.resolve_moves(moves)
+    for move in accepted:
+        move.entity.move(move.dx, move.dy)
+    return accepted
+
+
+def positions(actors) -> list:
+    return [(actor.x, actor.y) for actor in actors]
+
+
+def test_two_movers_one_tile():
+    engine = build_engine()
+    a = spawn(engine, 5, 5)
+    b = spawn(engine, 7, 5)
+    first = MovementAction(a, 1, 0)
+    accepted = resolve(engine, [first, MovementAction(b, -1, 0)])
+    # Первый заявивший клетку её и получает
+    assert accepted == [first]
+    assert positions([a, b]) == [(6, 5), (7, 5)]
+
+
+def test_chain_into_vacated_cells():
+    engine = build_engine()
+    actors = [spawn(engine, x, 5) for x in (5, 6, 7)]
+    moves = [MovementAction(actor, 1, 0) for actor in actors]
+    assert resolve(engine, moves) == moves
+    assert positions(actors) == [(6, 5), (7, 5), (8, 5)]
+
+
+def test_chain_stops_behind_blocked_head():
+    engine = build_engine()
+    engine.game_map.set_tile(8, 5, tile_types.wall)
+    actors = [spawn(engine, x, 5) for x in (5, 6, 7)]
+    # Голова упирается в стену, остальные не могут занять её клетку
+    assert resolve(engine, [MovementAction(actor, 1, 0) for actor in actors]) == []
+    assert positions(actors) == [(5, 5), (6, 5), (7, 5)]
+
+
+def test_chain_stops_behind_standing_actor():
+    engine = build_engine()
+    mover = spawn(engine, 5, 5)
+    spawn(engine, 6, 5)
+    assert resolve(engine, [MovementAction(mover, 1, 0)]) == []
+    assert positions([mover]) == [(5, 5)]
+
+
+def test_swap():
+    engine = build_engine()
+    a = spawn(engine, 5, 5)
+    b = spawn(engine, 6, 5)
+    moves = [MovementAction(a, 1, 0), MovementAction(b, -1, 0)]
+    assert resolve(engine, moves) == moves
+    assert positions([a, b]) == [(6, 5), (5, 5)]
+
+
+def test_moves_never_share_a_tile():
+    engine = build_engine()
+    actors = [spawn(engine, x, y) for x in range(4, 9) for y in range(3, 7)]
+    # Все двигаются к одной точке, итоговые клетки не повторяются
+    moves = [
+        MovementAction(actor, (actor.x < 6) - (actor.x > 6), (actor.y < 5) - (actor.y > 5))
+        for actor in actors
+    ]
+    resolve(engine, moves)
+    assert len(set(positions(actors))) == len(actors)
@@ -0,0 +1,52 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+import factions
+import setup_game
+import tile_types
+
+SAVE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "savegame.sav")
+
+
+def play_turns(engine, turns: int = 5) -> None:
+    for _ in range(turns):
+        engine.update_fov()
+        engine.handle_enemy_turns()
+
+
+def test_bundled_save_loads():
+    engine = setup_game.load_game(SAVE_FILE)
+    game_map = engine.game_map
+    assert game_map.tiles.dtype == tile_types.tile_id_dt
+    assert (game_map.walkable == tile_types.WALKABLE[game_map.tiles]).all()
+    assert engine.player.faction == factions.PLAYER
+    assert all(actor.faction == factions.HOSTILE for actor in game_map.actors if actor is not engine.player)
+    assert (engine.relations == factions.RELATIONS).all()
+    play_turns(engine)
+    # Со старым сохранением можно спуститься дальше
+    engine.game_world.generate_floor()
+    play_turns(engine)
+
+
+@pytest.mark.parametrize("storage", [False, True])
+def test_save_round_trip(tmp_path, storage):
+    random.seed(0)
+    engine = setup_game.new_game(map_storage_dir=str(tmp_path / "maps") if storage else None, seed=5)
+    engine.game_world.generate_floor()
+    play_turns(engine)
+    factions.set_aggression(engine.relations, factions.HOSTILE, factions.FRIENDLY, 0.25)
+    save_file = str(tmp_path / "savegame.sav")
+    engine.save_as(save_file)
+
+    loaded = setup_game.load_game(save_file)
+    assert np.array_equal(loaded.game_map.tiles, engine.game_map.tiles)
+    assert np.array_equal(loaded.game_map.explored, engine.game_map.explored)
+    assert np.array_equal(loaded.game_map.walkable, engine.game_map.walkable)
+    assert (loaded.player.x, loaded.player.y) == (engine.player.x, engine.player.y)
+    assert loaded.game_world.current_floor == engine.game_world.current_floor
+    assert loaded.relations[factions.HOSTILE, factions.FRIENDLY] == 0.25
+    assert len(list(loaded.game_map.actors)) == len(list(engine.game_map.actors))
+    play_turns(loaded)
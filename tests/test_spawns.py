@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+import pytest
+
+import factions
+import placement
+import procgen
+import setup_game
+
+
+def hostiles(game_map) -> list:
+    return [actor for actor in game_map.actors if actor.faction == factions.HOSTILE]
+
+
+def start_distance(engine) -> np.ndarray:
+    player = engine.player
+    return placement.walk_distance(engine.game_map.walkable, (player.x, player.y))
+
+
+@pytest.mark.parametrize("width, height", [(80, 43), (300, 300)])
+@pytest.mark.parametrize("floor", [2, 6])
+def test_dungeon_gets_monsters(width, height, floor):
+    for seed in range(3):
+        random.seed(seed)
+        engine = setup_game.new_floor(floor, width, height, seed=seed, layout="caves")
+        game_map = engine.game_map
+        monsters = len(hostiles(game_map))
+        # Каждый этаж просит не меньше 5 спавнов
+        assert monsters >= 5
+        if game_map.generation_report.counters.get("spawns_over_budget", 0):
+            # Спавны отбрасываются, только когда этаж заполнен почти до предела плотности
+            distance = start_distance(engine)
+            spawnable = game_map.walkable & ~((distance >= 0) & (distance <= procgen.SAFE_RADIUS))
+            assert monsters >= np.count_nonzero(spawnable) // procgen.FREE_CELLS_PER_SPAWN // 2
+
+
+def test_large_floor_spawns_everything():
+    random.seed(0)
+    engine = setup_game.new_floor(2, 300, 300, seed=0, layout="caves")
+    assert engine.game_map.generation_report.counters.get("spawns_over_budget", 0) == 0
+
+
+def test_monsters_keep_out_of_safe_radius():
+    for seed in range(5):
+        random.seed(seed)
+        engine = setup_game.new_floor(6, 80, 43, seed=seed, layout="caves")
+        distance = start_distance(engine)
+        for actor in hostiles(engine.game_map):
+            assert distance[actor.x, actor.y] == -1 or distance[actor.x, actor.y] > procgen.SAFE_RADIUS
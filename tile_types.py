@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Tuple
 
 import numpy as np  # type: ignore
 
@@ -11,6 +11,9 @@ graphic_dt = np.dtype(
     ]
 )
 
+# A map stores one tile ID per cell, an index into the tile registry below.
+tile_id_dt = np.dtype(np.uint8)
+
 # Tile struct used for statically defined tile data.
 tile_dt = np.dtype(
     [
@@ -33,48 +36,85 @@ def new_tile(
     return np.array((walkable, transparent, dark, light), dtype=tile_dt)
 
 
+# Every tile type is registered once, maps only store the ID of each cell.
+_registry: List[np.ndarray] = []
+
+
+def register(tile: np.ndarray) -> int:
+    """Add a tile type to the registry and return its ID."""
+    if len(_registry) > np.iinfo(tile_id_dt).max:
+        raise ValueError("Too many tile types for a uint8 tile ID.")
+    _registry.append(tile)
+    return len(_registry) - 1
+
+
 # SHROUD represents unexplored, unseen tiles
 SHROUD = np.array((ord(" "), (255, 255, 255), (0, 0, 0)), dtype=graphic_dt)
 
-floor = new_tile(
+floor = register(new_tile(
     walkable=True,
     transparent=True,
     dark=(ord("."), (128, 128, 128), (50, 50, 150)),
     light=(ord("."), (204, 204, 204), (200, 180, 50)),
-)
-wall = new_tile(
+))
+wall = register(new_tile(
     walkable=False,
     transparent=False,
     dark=(ord(" "), (255, 255, 255), (0, 0, 100)),
     light=(ord(" "), (255, 255, 255), (130, 110, 50)),
-)
-down_stairs = new_tile(
+))
+down_stairs = register(new_tile(
     walkable=True,
     transparent=True,
     dark=(ord(">"), (0, 0, 100), (50, 50, 150)),
     light=(ord(">"), (255, 255, 255), (200, 180, 50)),
-)
-city_wall = new_tile(
+))
+city_wall = register(new_tile(
     walkable=False,
     transparent=False,
     dark=(ord("#"), (130, 110, 50), (0, 0, 100)),
     light=(ord("#"), (130, 110, 50), (200, 180, 50)),
-)
-door = new_tile(
+))
+door = register(new_tile(
     walkable=True,
     transparent=False,
     dark=(ord("+"), (0xE0, 0x64, 0x1E), (0x99, 0x45, 0x15)),
     light=(ord("+"), (0xFF, 0x8C, 0x33), (0xCC, 0x5C, 0x1C)),
-)
-portal_blue = new_tile(
+))
+portal_blue = register(new_tile(
     walkable=True,
     transparent=True,
     dark=(ord("O"), (0, 0, 255), (0, 0, 100)),
     light=(ord("O"), (0, 128, 255), (0, 0, 150)),
-)
-portal_red = new_tile(
+))
+portal_red = register(new_tile(
     walkable=True,
     transparent=True,
     dark=(ord("O"), (255, 0, 0), (100, 0, 0)),
     light=(ord("O"), (255, 128, 128), (150, 0, 0)),
-)
\ No newline at end of file
+))
+
+# Lookup tables indexed by tile ID, e.g. WALKABLE[game_map.tiles].
+TILES = np.array(_registry, dtype=tile_dt)
+WALKABLE = TILES["walkable"]
+TRANSPARENT = TILES["transparent"]
+LIGHT = TILES["light"]
+DARK = TILES["dark"]
+
+
+def tile_ids(records: np.ndarray) -> np.ndarray:
+    """
+    Return the tile IDs of an array of tile_dt records, as kept by old saves.
+
+    A record matching no registered tile gets the first tile with the same
+    walkable and transparent flags, or a wall.
+    """
+    raw = np.dtype((np.void, tile_dt.itemsize))
+    unique, inverse = np.unique(np.ascontiguousarray(records, dtype=tile_dt).view(raw), return_inverse=True)
+    ids = np.empty(len(unique), dtype=tile_id_dt)
+    for i, record in enumerate(unique.view(tile_dt)):
+        same = np.flatnonzero(TILES.view(raw) == unique[i])
+        if not len(same):
+            same = np.flatnonzero((WALKABLE == record["walkable"]) & (TRANSPARENT == record["transparent"]))
+        ids[i] = same[0] if len(same) else wall
+    return np.asfortranarray(ids[inverse.reshape(records.shape)])